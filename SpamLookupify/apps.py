@@ -3,3 +3,6 @@ from django.apps import AppConfig
 class SpamlookupifyConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'SpamLookupify'
+
+    def ready(self):
+        from . import signals
@@ -0,0 +1,107 @@
+import asyncio
+from math import ceil
+from asgiref.sync import sync_to_async
+from django.http import HttpResponse
+from django.utils import timezone
+from django.views import View
+from rest_framework import exceptions
+from .authentication import SignedTokenAuthentication
+from .exceptions import custom_exception_handler
+from .pagination import get_page_size, decode_cursor, apaginate_stages, paginated_response
+from .phone import normalize_phone_number
+from .ratelimit import SearchThrottle
+from .renderers import dumps
+from .search import name_search_stages, name_search_results, registered_user_query, registered_user_result, phone_number_contacts, phone_number_contact_results
+from . import spam_cache, metrics
+
+def json_response(data, status=200):
+    return HttpResponse(dumps(data), status=status, content_type='application/json')
+
+class AsyncSearchView(View):
+    """
+    SearchView for ASGI deployments: same parameters and responses, served from the event loop
+    with the async ORM. Accepts a session or a signed token.
+    """
+    throttle_classes = [SearchThrottle]
+
+    async def get(self, request):
+        try:
+            request.user = await self.authenticate(request)
+            await self.check_throttles(request)
+
+            query = request.GET.get('query')
+            phone_number = request.GET.get('phone_number')
+
+            if not query and not phone_number:
+                return json_response({"error": "At least one search query is required"}, status=400)
+
+            if query:
+                kind, (response, found) = 'name', await self.filter_using_query(request, query)
+            else:
+                kind, (response, found) = 'phone_number', await self.filter_using_phone_number(request, phone_number)
+        except exceptions.APIException as exc:
+            return self.handle_exception(request, exc)
+
+        metrics.SEARCHES.inc(kind=kind, result='hit' if found else 'miss')
+        return response
+
+    async def authenticate(self, request):
+        user = await request.auser()
+        if not user.is_authenticated:
+            authenticated = SignedTokenAuthentication().authenticate(request)
+            if authenticated is None:
+                raise exceptions.NotAuthenticated()
+            user = authenticated[0]
+        return user
+
+    async def check_throttles(self, request):
+        for throttle_class in self.throttle_classes:
+            throttle = throttle_class()
+            if not await sync_to_async(throttle.allow_request)(request, self):
+                raise exceptions.Throttled(throttle.wait())
+
+    def handle_exception(self, request, exc):
+        # Like APIView: without a WWW-Authenticate challenge, authentication errors are 403s.
+        if isinstance(exc, (exceptions.NotAuthenticated, exceptions.AuthenticationFailed)):
+            exc.status_code = 403
+
+        drf_response = custom_exception_handler(exc, {'request': request, 'view': self})
+        response = json_response(drf_response.data, status=drf_response.status_code)
+        if isinstance(exc, exceptions.Throttled) and exc.wait is not None:
+            response['Retry-After'] = str(ceil(exc.wait))
+        return response
+
+    async def filter_using_query(self, request, query):
+        stages = name_search_stages(query)
+        rows, next_position = await apaginate_stages(stages, decode_cursor(request, len(stages)), get_page_size(request))
+        results = await sync_to_async(name_search_results)(rows, normalize_phone_number(request.user.phone_number), timezone.now())
+
+        return paginated_response(request, json_response(results), next_position), bool(results)
+
+    async def filter_using_phone_number(self, request, phone_number):
+        position = decode_cursor(request, 1)
+        phone_number = normalize_phone_number(phone_number) or phone_number
+        requesting_phone_number = normalize_phone_number(request.user.phone_number)
+
+        user_query = registered_user_query(phone_number, position)
+        get_reputation = sync_to_async(spam_cache.get_reputation)
+        reputation = None
+
+        if user_query is not None:
+            # The registered user and the spam reputation are independent lookups.
+            user, reputation = await asyncio.gather(user_query.afirst(), get_reputation(phone_number))
+            if user:
+                result = await sync_to_async(registered_user_result)(user, phone_number, request.user.id, *reputation)
+                return json_response([result]), True
+
+        rows, next_position = await apaginate_stages([phone_number_contacts(phone_number)], position, get_page_size(request))
+
+        if not rows:
+            if position is None:
+                return json_response({"error": "No contacts found."}, status=404), False
+            return json_response([]), False
+
+        if reputation is None:
+            reputation = await get_reputation(phone_number)
+        results = await sync_to_async(phone_number_contact_results)(rows, requesting_phone_number, *reputation)
+        return paginated_response(request, json_response(results), next_position), True
@@ -0,0 +1,46 @@
+from django.conf import settings
+from django.core import signing
+from rest_framework.authentication import BaseAuthentication, get_authorization_header
+from rest_framework.exceptions import AuthenticationFailed
+from .models import User
+
+TOKEN_SALT = 'SpamLookupify.auth-token'
+CLAIMS = ('id', 'username', 'name', 'phone_number', 'normalized_phone_number', 'email', 'is_staff')
+
+DEFAULTS = {
+    'KEYWORD': 'Bearer',
+    'MAX_AGE': 3600,
+}
+
+def get_config():
+    return {**DEFAULTS, **getattr(settings, 'AUTH_TOKEN', {})}
+
+def issue_token(user):
+    return signing.dumps({claim: getattr(user, claim) for claim in CLAIMS}, salt=TOKEN_SALT, compress=True)
+
+class SignedTokenAuthentication(BaseAuthentication):
+    """
+    Stateless authentication with tokens from issue_token, sent as ``Authorization: Bearer <token>``.
+    The user is rebuilt from the signed claims, so no query runs per request; a token stays
+    valid until it expires, even after logout or a change to the user.
+    """
+    def authenticate(self, request):
+        config = get_config()
+        header = get_authorization_header(request).split()
+        if not header or header[0].lower() != config['KEYWORD'].lower().encode():
+            return None
+        if len(header) != 2:
+            raise AuthenticationFailed("Invalid token header.")
+
+        token = header[1].decode()
+        try:
+            claims = signing.loads(token, salt=TOKEN_SALT, max_age=config['MAX_AGE'])
+        except signing.SignatureExpired:
+            raise AuthenticationFailed("Token has expired. Please login again.")
+        except signing.BadSignature:
+            raise AuthenticationFailed("Invalid token.")
+
+        return User(**claims, is_active=True), token
+
+    def authenticate_header(self, request):
+        return get_config()['KEYWORD']
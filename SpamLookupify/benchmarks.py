@@ -0,0 +1,261 @@
+import asyncio
+import random
+import statistics
+import time
+from concurrent.futures import ThreadPoolExecutor
+from asgiref.sync import async_to_sync
+from django.db import connection, connections
+from django.test import Client, AsyncClient
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils.functional import cached_property
+from .models import User, Contact
+from .authentication import issue_token
+
+# Dataset sizes accepted by ``manage.py benchmark --scale``, as populate_db arguments.
+SCALES = {
+    '10k': {'users': 1000, 'contacts_per_user': 10, 'spam_reports': 1000},
+    '1m': {'users': 20000, 'contacts_per_user': 50, 'spam_reports': 50000},
+    '10m': {'users': 100000, 'contacts_per_user': 100, 'spam_reports': 500000},
+}
+
+SCENARIOS = {}
+
+# Contacts of the user behind the contacts_list_large scenario.
+ADDRESS_BOOK_SIZE = 5000
+
+def scenario(name, items_per_request=1):
+    def register(func):
+        SCENARIOS[name] = (func, items_per_request)
+        return func
+    return register
+
+class Fixture:
+    """
+    Inputs shared by the scenarios: a logged-in client and samples of existing rows.
+    """
+    def __init__(self, seed=0, samples=200, password='password'):
+        self.random = random.Random(seed)
+        self.user = User.objects.order_by('id').first()
+        self.password = password
+        self.client = Client()
+        self.client.force_login(self.user)
+        self.contacts = self.sample_contacts(samples)
+        # Above the ranges populate_db draws numbers from.
+        self.next_number = 9000000000
+
+    def sample_contacts(self, samples):
+        last_id = Contact.objects.order_by('-id').values_list('id', flat=True).first() or 0
+        contacts = []
+        for _ in range(samples):
+            contact = Contact.objects.filter(id__gte=self.random.randint(1, max(last_id, 1))).values('name', 'phone_number').first()
+            if contact:
+                contacts.append(contact)
+        return contacts
+
+    def contact(self):
+        return self.random.choice(self.contacts)
+
+    @cached_property
+    def address_book_client(self):
+        """
+        A client logged in as a user with ADDRESS_BOOK_SIZE contacts, created on first use.
+        """
+        user, created = User.objects.get_or_create(
+            username='benchmark-address-book',
+            defaults={'name': 'Address Book', 'phone_number': '+17999999999', 'normalized_phone_number': '+17999999999'},
+        )
+        if created:
+            Contact.objects.bulk_create(
+                [
+                    Contact(owner=user, name=f'Contact {index}', phone_number=f'+1{8000000000 + index}', normalized_phone_number=f'+1{8000000000 + index}')
+                    for index in range(ADDRESS_BOOK_SIZE)
+                ],
+                batch_size=1000,
+            )
+
+        client = Client()
+        client.force_login(user)
+        return client
+
+    @cached_property
+    def address_book_etag(self):
+        return self.address_book_client.get(reverse('contact-list-create'))['ETag']
+
+    def new_phone_number(self):
+        self.next_number += 1
+        return f'+1{self.next_number}'
+
+@scenario('search_name')
+def search_name(fixture):
+    name = fixture.contact()['name']
+    return fixture.client.get(reverse('search'), {'query': name[:3]})
+
+@scenario('search_phone_number')
+def search_phone_number(fixture):
+    return fixture.client.get(reverse('search'), {'phone_number': fixture.contact()['phone_number']})
+
+@scenario('report_spam')
+def report_spam(fixture):
+    return fixture.client.post(reverse('report-spam'), {'phone_number': fixture.contact()['phone_number']})
+
+@scenario('report_spam_bulk', items_per_request=100)
+def report_spam_bulk(fixture):
+    phone_numbers = [fixture.contact()['phone_number'] for _ in range(100)]
+    return fixture.client.post(reverse('report-spam-bulk'), {'phone_numbers': phone_numbers}, content_type='application/json')
+
+@scenario('login')
+def login(fixture):
+    return Client().post(reverse('login'), {'username': fixture.user.username, 'password': fixture.password, 'auth': 'token'})
+
+@scenario('contacts_list')
+def contacts_list(fixture):
+    return fixture.client.get(reverse('contact-list-create'))
+
+@scenario('contacts_list_large', items_per_request=ADDRESS_BOOK_SIZE)
+def contacts_list_large(fixture):
+    return fixture.address_book_client.get(reverse('contact-list-create'))
+
+@scenario('contacts_list_large_unchanged', items_per_request=ADDRESS_BOOK_SIZE)
+def contacts_list_large_unchanged(fixture):
+    # A polling client revalidating its copy: answered with a 304.
+    return fixture.address_book_client.get(reverse('contact-list-create'), HTTP_IF_NONE_MATCH=fixture.address_book_etag)
+
+@scenario('contacts_create')
+def contacts_create(fixture):
+    return fixture.client.post(reverse('contact-list-create'), {'name': 'Benchmark Contact', 'phone_number': fixture.new_phone_number()})
+
+def percentile(values, fraction):
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, round(fraction * len(ordered)) - 1))
+    return ordered[index]
+
+def run_scenario(name, fixture, requests, warmup=5, query_samples=20):
+    """
+    Times ``requests`` requests, then counts the queries of ``query_samples`` more in a separate
+    pass: capturing queries wraps every cursor and would inflate the timed latencies.
+    """
+    func, items_per_request = SCENARIOS[name]
+
+    for _ in range(warmup):
+        func(fixture)
+
+    latencies = []
+    errors = 0
+    started = time.perf_counter()
+
+    for _ in range(requests):
+        request_started = time.perf_counter()
+        response = func(fixture)
+        latencies.append((time.perf_counter() - request_started) * 1000)
+        if response.status_code >= 400:
+            errors += 1
+
+    elapsed = time.perf_counter() - started
+
+    queries = []
+    for _ in range(min(requests, query_samples)):
+        with CaptureQueriesContext(connection) as captured:
+            func(fixture)
+        queries.append(len(captured))
+
+    return {
+        'requests': requests,
+        'errors': errors,
+        'latency_ms': {
+            'p50': round(percentile(latencies, 0.50), 3),
+            'p95': round(percentile(latencies, 0.95), 3),
+            'p99': round(percentile(latencies, 0.99), 3),
+            'mean': round(statistics.fmean(latencies), 3),
+        },
+        'requests_per_second': round(requests / elapsed, 2),
+        'items_per_second': round(requests * items_per_request / elapsed, 2),
+        'queries_per_request': {
+            'mean': round(statistics.fmean(queries), 2),
+            'max': max(queries),
+        },
+    }
+
+def run(scenarios, requests, seed=0):
+    fixture = Fixture(seed=seed)
+    return {name: run_scenario(name, fixture, requests) for name in scenarios}
+
+# Request parameters for the concurrent comparison of the sync (WSGI) and async (ASGI) search.
+CONCURRENT_SCENARIOS = {
+    'search_name': lambda fixture: {'query': fixture.contact()['name'][:3]},
+    'search_phone_number': lambda fixture: {'phone_number': fixture.contact()['phone_number']},
+}
+
+def summarize(latencies, errors, elapsed):
+    return {
+        'requests': len(latencies),
+        'errors': errors,
+        'latency_ms': {
+            'p50': round(percentile(latencies, 0.50), 3),
+            'p95': round(percentile(latencies, 0.95), 3),
+            'p99': round(percentile(latencies, 0.99), 3),
+        },
+        'requests_per_second': round(len(latencies) / elapsed, 2),
+    }
+
+def run_sync_concurrently(path, params, concurrency, headers):
+    """
+    ``concurrency`` threads, each with its own client, replay ``params`` through the WSGI handler.
+    """
+    latencies = []
+    errors = 0
+
+    def worker(chunk):
+        nonlocal errors
+        client = Client(headers=headers)
+        try:
+            for query in chunk:
+                started = time.perf_counter()
+                response = client.get(path, query)
+                latencies.append((time.perf_counter() - started) * 1000)
+                errors += response.status_code >= 400
+        finally:
+            connections.close_all()
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        list(executor.map(worker, [params[index::concurrency] for index in range(concurrency)]))
+    return summarize(latencies, errors, time.perf_counter() - started)
+
+def run_async_concurrently(path, params, concurrency, headers):
+    """
+    ``concurrency`` coroutines share one event loop and replay ``params`` through the ASGI handler.
+    """
+    latencies = []
+    errors = 0
+
+    async def worker(chunk):
+        nonlocal errors
+        # AsyncClient drops headers given to its constructor, so they go on every request.
+        client = AsyncClient()
+        for query in chunk:
+            started = time.perf_counter()
+            response = await client.get(path, query, headers=headers)
+            latencies.append((time.perf_counter() - started) * 1000)
+            errors += response.status_code >= 400
+
+    async def run_all():
+        await asyncio.gather(*(worker(params[index::concurrency]) for index in range(concurrency)))
+
+    started = time.perf_counter()
+    async_to_sync(run_all)()
+    return summarize(latencies, errors, time.perf_counter() - started)
+
+def compare_concurrency(requests, concurrency, seed=0):
+    fixture = Fixture(seed=seed)
+    headers = {'Authorization': f'Bearer {issue_token(fixture.user)}'}
+    results = {}
+
+    for name, make_params in CONCURRENT_SCENARIOS.items():
+        params = [make_params(fixture) for _ in range(requests)]
+        results[name] = {
+            'sync': run_sync_concurrently(reverse('search'), params, concurrency, headers),
+            'async': run_async_concurrently(reverse('search-async'), params, concurrency, headers),
+        }
+
+    return results
@@ -0,0 +1,46 @@
+from django.db.models import F
+from django.utils import timezone
+from .models import User, Contact
+
+def touch(owner_ids):
+    """
+    Record a change to the contact lists of ``owner_ids`` (ids, or a queryset of them). Every
+    contact write calls this so that conditional GETs see a new ETag and Last-Modified.
+    """
+    User.objects.filter(id__in=owner_ids).update(
+        contacts_version=F('contacts_version') + 1, contacts_modified_at=timezone.now(),
+    )
+
+def list_version(request):
+    """
+    (version, modified_at) of the requesting user's contacts, read once per request: token
+    authenticated users are rebuilt from the token and do not carry them.
+    """
+    if not hasattr(request, '_contacts_version'):
+        request._contacts_version = User.objects.filter(id=request.user.id).values_list(
+            'contacts_version', 'contacts_modified_at',
+        ).first()
+    return request._contacts_version
+
+def detail_version(request, contact_id):
+    if not hasattr(request, '_contacts_version'):
+        request._contacts_version = Contact.objects.filter(id=contact_id).values_list(
+            'owner__contacts_version', 'owner__contacts_modified_at',
+        ).first()
+    return request._contacts_version
+
+def list_etag(request, *args, **kwargs):
+    version = list_version(request)
+    return f'"contacts-{request.user.id}-{version[0]}"' if version else None
+
+def list_last_modified(request, *args, **kwargs):
+    version = list_version(request)
+    return version[1] if version else None
+
+def detail_etag(request, contact_id):
+    version = detail_version(request, contact_id)
+    return f'"contact-{contact_id}-{version[0]}"' if version else None
+
+def detail_last_modified(request, contact_id):
+    version = detail_version(request, contact_id)
+    return version[1] if version else None
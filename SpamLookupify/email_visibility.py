@@ -0,0 +1,15 @@
+from .models import Contact
+
+def holders_among(phone_number, user_ids):
+    """
+    The users among ``user_ids`` who hold ``phone_number`` in their contacts, i.e. who show
+    their email to the user with that number. One query over the (normalized_phone_number, owner)
+    index covers a whole page; it is not cached, so a contact change is seen by the next search
+    in every worker process.
+    """
+    if not phone_number or not user_ids:
+        return set()
+    return set(
+        Contact.objects.filter(normalized_phone_number=phone_number, owner_id__in=user_ids)
+        .values_list('owner_id', flat=True).distinct()
+    )
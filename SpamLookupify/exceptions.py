@@ -1,7 +1,12 @@
 from rest_framework.views import exception_handler
 from rest_framework.exceptions import NotAuthenticated
+from rest_framework.response import Response
+from .hashers import PasswordHashingBusy
 
 def custom_exception_handler(exc, context):
+    if isinstance(exc, PasswordHashingBusy):
+        return Response({"detail": str(exc)}, status=503)
+
     response = exception_handler(exc, context)
 
     if isinstance(exc, NotAuthenticated):
@@ -0,0 +1,82 @@
+import csv
+import io
+import zlib
+from django.conf import settings
+from rest_framework.fields import DateTimeField
+from .models import Contact, SpamReporters
+from .renderers import dumps
+
+CONTACT_FIELDS = ('id', 'name', 'phone_number', 'is_spam', 'is_anonymous')
+SPAM_REPORT_FIELDS = ('phone_number', 'report_count', 'first_reported_at', 'last_reported_at')
+CSV_COLUMNS = ('type', *CONTACT_FIELDS, *SPAM_REPORT_FIELDS[1:])
+
+_datetime_field = DateTimeField()
+
+def get_chunk_size():
+    return getattr(settings, 'EXPORT_CHUNK_SIZE', 2000)
+
+def get_since_overlap():
+    return getattr(settings, 'EXPORT_SINCE_OVERLAP_SECONDS', 60)
+
+def export_rows(user, since=None, until=None, chunk_size=None):
+    """
+    The user's contacts followed by the spam reports they filed, one dict per row with a
+    ``type`` key. Only reports last filed in (since, until] are included; contacts carry no
+    timestamp and are always exported in full. Rows are read ``chunk_size`` at a time.
+    """
+    chunk_size = chunk_size or get_chunk_size()
+
+    contacts = Contact.objects.filter(owner=user).order_by('id').values_list(*CONTACT_FIELDS)
+    for values in contacts.iterator(chunk_size=chunk_size):
+        yield {'type': 'contact', **dict(zip(CONTACT_FIELDS, values))}
+
+    reports = SpamReporters.objects.filter(user=user)
+    if since is not None:
+        reports = reports.filter(last_reported_at__gt=since)
+    if until is not None:
+        reports = reports.filter(last_reported_at__lte=until)
+
+    for phone_number, report_count, first_reported_at, last_reported_at in reports.order_by('last_reported_at', 'id').values_list(
+        *SPAM_REPORT_FIELDS
+    ).iterator(chunk_size=chunk_size):
+        yield {
+            'type': 'spam_report',
+            'phone_number': phone_number,
+            'report_count': report_count,
+            'first_reported_at': _datetime_field.to_representation(first_reported_at),
+            'last_reported_at': _datetime_field.to_representation(last_reported_at),
+        }
+
+def batched(rows, size):
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+def ndjson_stream(rows, chunk_size=None):
+    for batch in batched(rows, chunk_size or get_chunk_size()):
+        yield b''.join(dumps(row) + b'\n' for row in batch)
+
+def gzipped_csv_stream(rows, chunk_size=None):
+    """
+    CSV with CSV_COLUMNS, gzip-compressed as it is produced: each batch of rows is written and
+    compressed before the next is read.
+    """
+    compressor = zlib.compressobj(wbits=zlib.MAX_WBITS | 16)
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, CSV_COLUMNS, extrasaction='ignore')
+    writer.writeheader()
+
+    for batch in batched(rows, chunk_size or get_chunk_size()):
+        writer.writerows(batch)
+        chunk = compressor.compress(buffer.getvalue().encode())
+        buffer.seek(0)
+        buffer.truncate()
+        if chunk:
+            yield chunk
+
+    yield compressor.compress(buffer.getvalue().encode()) + compressor.flush()
@@ -0,0 +1,109 @@
+import threading
+from django.conf import settings
+from django.contrib.auth.hashers import PBKDF2PasswordHasher, ScryptPasswordHasher
+
+DEFAULTS = {
+    'SCRYPT_WORK_FACTOR': 2 ** 15,
+    'SCRYPT_BLOCK_SIZE': 8,
+    'SCRYPT_PARALLELISM': 1,
+    'PBKDF2_ITERATIONS': PBKDF2PasswordHasher.iterations,
+    # Admission control for hashing and verification. At most MAX_CONCURRENT hashes run at once
+    # and up to MAX_PENDING callers wait for a turn; a caller that cannot get in line within
+    # QUEUE_TIMEOUT seconds gets PasswordHashingBusy (a 503) instead of piling onto the CPU.
+    # Hashes still run on the request's own thread, which waits for them.
+    'LIMIT_CONCURRENCY': False,
+    'MAX_CONCURRENT': 4,
+    'MAX_PENDING': 64,
+    'QUEUE_TIMEOUT': 1.0,
+}
+
+_running = None
+_slots = None
+_semaphores_lock = threading.Lock()
+_admitted = threading.local()
+
+def get_config():
+    return {**DEFAULTS, **getattr(settings, 'PASSWORD_HASHING', {})}
+
+class PasswordHashingBusy(Exception):
+    """
+    Raised when the hashing queue is full. The API's exception handler and
+    PasswordHashingBusyMiddleware answer it with a 503.
+    """
+    def __init__(self, message="Too many logins in progress. Please try again shortly."):
+        super().__init__(message)
+
+def get_semaphores(config):
+    global _running, _slots
+
+    if _running is None:
+        with _semaphores_lock:
+            if _running is None:
+                _slots = threading.BoundedSemaphore(config['MAX_CONCURRENT'] + config['MAX_PENDING'])
+                _running = threading.BoundedSemaphore(config['MAX_CONCURRENT'])
+    return _running, _slots
+
+def admit(func, *args, **kwargs):
+    config = get_config()
+    # Hashers call each other (verify() encodes), so a thread already admitted runs straight away.
+    if not config['LIMIT_CONCURRENCY'] or getattr(_admitted, 'active', False):
+        return func(*args, **kwargs)
+
+    running, slots = get_semaphores(config)
+    if not slots.acquire(timeout=config['QUEUE_TIMEOUT']):
+        raise PasswordHashingBusy()
+
+    try:
+        with running:
+            _admitted.active = True
+            try:
+                return func(*args, **kwargs)
+            finally:
+                _admitted.active = False
+    finally:
+        slots.release()
+
+def reset():
+    global _running, _slots
+
+    with _semaphores_lock:
+        _running = _slots = None
+
+class AdmissionControlMixin:
+    def encode(self, password, salt, *args, **kwargs):
+        return admit(super().encode, password, salt, *args, **kwargs)
+
+    def verify(self, password, encoded):
+        return admit(super().verify, password, encoded)
+
+    def harden_runtime(self, password, encoded):
+        return admit(super().harden_runtime, password, encoded)
+
+class TunedScryptPasswordHasher(AdmissionControlMixin, ScryptPasswordHasher):
+    """
+    Scrypt with its cost parameters taken from settings.PASSWORD_HASHING. Stored hashes keep
+    the parameters they were made with and are rehashed on the next login after a change.
+    """
+    # Upper bound only: hashlib refuses anything above 32MB by default, and scrypt needs
+    # about 128 * n * r bytes.
+    maxmem = 2 ** 30
+
+    @property
+    def work_factor(self):
+        return get_config()['SCRYPT_WORK_FACTOR']
+
+    @property
+    def block_size(self):
+        return get_config()['SCRYPT_BLOCK_SIZE']
+
+    @property
+    def parallelism(self):
+        return get_config()['SCRYPT_PARALLELISM']
+
+class TunedPBKDF2PasswordHasher(AdmissionControlMixin, PBKDF2PasswordHasher):
+    """
+    PBKDF2-SHA256 with the iteration count from settings.PASSWORD_HASHING.
+    """
+    @property
+    def iterations(self):
+        return get_config()['PBKDF2_ITERATIONS']
@@ -0,0 +1,90 @@
+import json
+from pathlib import Path
+from django.conf import settings
+from django.core.management import call_command
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.test.utils import override_settings
+from django.utils import timezone
+from SpamLookupify import benchmarks
+from SpamLookupify.models import User, Contact, SpamReputation
+from SpamLookupify.request_log import stop_writer
+
+class Command(BaseCommand):
+    help = (
+        "Seeds a throwaway database per scale and measures latency percentiles, throughput "
+        "and query counts for each API endpoint. Results are written as JSON."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--scale', action='append', choices=list(benchmarks.SCALES), help="Dataset size; repeatable (default: 10k).")
+        parser.add_argument('--scenario', action='append', choices=list(benchmarks.SCENARIOS), help="Endpoint scenario; repeatable (default: all).")
+        parser.add_argument('--requests', type=int, default=200, help="Measured requests per scenario.")
+        parser.add_argument('--concurrency', type=int, default=0, help="Also compare the sync and async search with this many concurrent clients.")
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--output', default='benchmark-results.json')
+        parser.add_argument('--keepdb', action='store_true', help="Keep the seeded databases and reuse them on the next run.")
+
+    def handle(self, *args, **options):
+        scales = options['scale'] or ['10k']
+        scenarios = options['scenario'] or list(benchmarks.SCENARIOS)
+        results = {
+            'generated_at': timezone.now().isoformat(),
+            'database': connection.vendor,
+            'requests_per_scenario': options['requests'],
+            'scales': {},
+        }
+
+        for scale in scales:
+            self.stdout.write(f"Benchmarking the {scale} dataset...")
+            old_name = self.create_database(scale, options['keepdb'])
+            try:
+                # One client replays every request, so rate limits are switched off.
+                with override_settings(ALLOWED_HOSTS=['testserver'], RATELIMIT={'ENABLED': False}):
+                    if not User.objects.exists():
+                        call_command('populate_db', **benchmarks.SCALES[scale], seed=options['seed'], stdout=self.stdout)
+
+                    results['scales'][scale] = {
+                        'dataset': {
+                            'users': User.objects.count(),
+                            'contacts': Contact.objects.count(),
+                            'spam_numbers': SpamReputation.objects.count(),
+                        },
+                        'endpoints': benchmarks.run(scenarios, options['requests'], seed=options['seed']),
+                    }
+                    if options['concurrency']:
+                        results['scales'][scale]['concurrency'] = benchmarks.compare_concurrency(
+                            options['requests'], options['concurrency'], seed=options['seed'],
+                        )
+            finally:
+                stop_writer()
+                connection.creation.destroy_test_db(old_name, verbosity=0, keepdb=options['keepdb'])
+
+            for name, result in results['scales'][scale]['endpoints'].items():
+                latency = result['latency_ms']
+                self.stdout.write(
+                    f"  {name:<22} p50 {latency['p50']:>8.2f}ms  p95 {latency['p95']:>8.2f}ms  p99 {latency['p99']:>8.2f}ms  "
+                    f"{result['requests_per_second']:>8.1f} req/s  {result['queries_per_request']['mean']:>5.1f} queries"
+                )
+
+            for name, modes in results['scales'][scale].get('concurrency', {}).items():
+                for mode, result in modes.items():
+                    latency = result['latency_ms']
+                    self.stdout.write(
+                        f"  {name + ' (' + mode + ')':<30} p50 {latency['p50']:>8.2f}ms  p99 {latency['p99']:>8.2f}ms  "
+                        f"{result['requests_per_second']:>8.1f} req/s  {result['errors']} errors"
+                    )
+
+        Path(options['output']).write_text(json.dumps(results, indent=2))
+        self.stdout.write(self.style.SUCCESS(f"Results written to {options['output']}."))
+
+    def create_database(self, scale, keepdb):
+        old_name = connection.settings_dict['NAME']
+        if connection.vendor == 'sqlite':
+            name = str(Path(settings.BASE_DIR) / f'benchmark_{scale}.sqlite3')
+        else:
+            name = f'benchmark_{scale}'
+
+        connection.settings_dict.setdefault('TEST', {})['NAME'] = name
+        connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False, keepdb=keepdb)
+        return old_name
@@ -0,0 +1,43 @@
+import time
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.test.utils import override_settings
+from django.urls import reverse
+from rest_framework.test import APIClient
+from SpamLookupify.models import User
+
+class Command(BaseCommand):
+    help = "Compares the throughput of single and bulk spam reporting. All changes are rolled back."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--reports', type=int, default=1000)
+        parser.add_argument('--batch-size', type=int, default=500)
+
+    def handle(self, *args, **options):
+        reports = options['reports']
+        batch_size = options['batch_size']
+
+        # One client files every report, so rate limits are switched off.
+        with override_settings(ALLOWED_HOSTS=['testserver'], REQUEST_LOG={'MODE': 'sync'}, RATELIMIT={'ENABLED': False}), transaction.atomic():
+            user = User.objects.create(name='Benchmark Reporter', username='benchmark-reporter', phone_number='+19999999999')
+            client = APIClient()
+            client.force_authenticate(user)
+
+            single_numbers = [f'+1555{index:07d}' for index in range(reports)]
+            bulk_numbers = [f'+1556{index:07d}' for index in range(reports)]
+
+            start = time.perf_counter()
+            for phone_number in single_numbers:
+                client.post(reverse('report-spam'), {'phone_number': phone_number})
+            single_seconds = time.perf_counter() - start
+
+            start = time.perf_counter()
+            for offset in range(0, reports, batch_size):
+                client.post(reverse('report-spam-bulk'), {'phone_numbers': bulk_numbers[offset:offset + batch_size]}, format='json')
+            bulk_seconds = time.perf_counter() - start
+
+            transaction.set_rollback(True)
+
+        self.stdout.write(f"single: {reports} reports in {single_seconds:.2f}s ({reports / single_seconds:.0f} reports/s)")
+        self.stdout.write(f"bulk:   {reports} reports in {bulk_seconds:.2f}s ({reports / bulk_seconds:.0f} reports/s, batch size {batch_size})")
+        self.stdout.write(self.style.SUCCESS(f"Bulk reporting is {single_seconds / bulk_seconds:.1f}x faster."))
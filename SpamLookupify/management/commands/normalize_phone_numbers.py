@@ -0,0 +1,128 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from SpamLookupify.models import User, Contact, SpamReport, SpamReporters
+from SpamLookupify.phone import normalize_phone_number
+from SpamLookupify import spam_cache, reputation
+
+class Command(BaseCommand):
+    help = (
+        "Backfills normalized phone numbers on users and contacts and merges spam counters "
+        "stored under different spellings of the same number."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=2000)
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+
+        for model in (User, Contact):
+            updated = self.backfill(model, batch_size)
+            self.stdout.write(f"{model.__name__}: normalized {updated} phone numbers.")
+
+        merged = self.merge(SpamReport, ['phone_number'], batch_size)
+        self.stdout.write(f"SpamReport: canonicalized {merged} rows.")
+        merged = self.merge(SpamReporters, ['user_id', 'phone_number'], batch_size)
+        self.stdout.write(f"SpamReporters: canonicalized {merged} rows.")
+        if merged:
+            self.stdout.write(f"SpamReputation: rebuilt {reputation.rebuild(batch_size=batch_size)} rows.")
+
+        self.stdout.write(self.style.SUCCESS("Phone numbers normalized."))
+
+    def batches(self, model, fields, batch_size):
+        last_id = 0
+        while True:
+            batch = list(model.objects.filter(id__gt=last_id).order_by('id').only('id', *fields)[:batch_size])
+            if not batch:
+                return
+            yield batch
+            last_id = batch[-1].id
+
+    def backfill(self, model, batch_size):
+        updated = 0
+        for batch in self.batches(model, ['phone_number', 'normalized_phone_number'], batch_size):
+            changed = []
+            holders = self.holders(batch) if model is User else {}
+            for obj in batch:
+                normalized = normalize_phone_number(obj.phone_number) or ''
+                if model is User and normalized and holders.setdefault(normalized, obj.id) != obj.id:
+                    self.stderr.write(f"User {obj.id}: {normalized} is already registered by user {holders[normalized]}.")
+                    normalized = ''
+                if obj.normalized_phone_number != normalized:
+                    obj.normalized_phone_number = normalized
+                    changed.append(obj)
+
+            model.objects.bulk_update(changed, ['normalized_phone_number'])
+            updated += len(changed)
+
+        return updated
+
+    def holders(self, users):
+        """
+        The user holding each canonical number of ``users``. Whoever already holds a number keeps
+        it, other users with a spelling of it are left without one.
+        """
+        numbers = {normalize_phone_number(user.phone_number) for user in users} - {None}
+        return dict(User.objects.filter(normalized_phone_number__in=numbers).values_list('normalized_phone_number', 'id'))
+
+    def merge(self, model, key_fields, batch_size):
+        """
+        Rewrite counter rows to the canonical phone number. A row whose canonical key is
+        already taken is folded into the existing row and deleted.
+        """
+        counter = 'spam_count' if model is SpamReport else 'report_count'
+        fields = [*key_fields, counter, 'last_reported_at']
+        if model is SpamReporters:
+            fields.append('first_reported_at')
+
+        def key(obj, phone_number):
+            return tuple(phone_number if field == 'phone_number' else getattr(obj, field) for field in key_fields)
+
+        merged = 0
+        for batch in self.batches(model, fields, batch_size):
+            variants = []
+            for obj in batch:
+                canonical = normalize_phone_number(obj.phone_number)
+                if canonical not in (None, obj.phone_number):
+                    variants.append((obj, canonical))
+            if not variants:
+                continue
+
+            with transaction.atomic():
+                targets = {
+                    key(obj, obj.phone_number): obj
+                    for obj in model.objects.select_for_update().filter(
+                        phone_number__in={canonical for _, canonical in variants}
+                    ).only('id', *fields)
+                }
+
+                renamed = []
+                folded = {}
+                deleted = []
+                for obj, canonical in variants:
+                    target = targets.get(key(obj, canonical))
+                    if target is None:
+                        obj.phone_number = canonical
+                        targets[key(obj, canonical)] = obj
+                        renamed.append(obj)
+                        continue
+
+                    setattr(target, counter, getattr(target, counter) + getattr(obj, counter))
+                    target.last_reported_at = max(target.last_reported_at, obj.last_reported_at)
+                    if model is SpamReporters:
+                        target.first_reported_at = min(target.first_reported_at, obj.first_reported_at)
+                    folded[target.id] = target
+                    deleted.append(obj.id)
+
+                update_fields = [field for field in fields if field not in key_fields]
+                model.objects.filter(id__in=deleted).delete()
+                model.objects.bulk_update(renamed, ['phone_number', *update_fields])
+                model.objects.bulk_update(
+                    [target for target in folded.values() if target not in renamed],
+                    update_fields,
+                )
+                spam_cache.invalidate({canonical for _, canonical in variants})
+
+            merged += len(variants)
+
+        return merged
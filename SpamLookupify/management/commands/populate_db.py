@@ -1,34 +1,179 @@
 import random
-from django.core.management.base import BaseCommand
-from SpamLookupify.models import User, Contact, SpamReport
+import time
+from collections import Counter
+from itertools import accumulate
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.utils import timezone
+from SpamLookupify.models import User, Contact, SpamReporters, NameSearchTerm
+from SpamLookupify.search_index import build_terms
+from SpamLookupify.upsert import increment_or_create
+from SpamLookupify import spam_cache, reputation
 from faker import Faker
 
 fake = Faker()
 
+USER_NUMBER_BASE = 2000000000
+EXTERNAL_NUMBER_BASE = 3000000000
+
+def zipf_weights(size, skew):
+    """
+    Cumulative Zipf weights: the item at rank ``r`` is picked with probability proportional
+    to ``1 / r ** skew``. A skew of 0 gives a uniform distribution.
+    """
+    return list(accumulate(1 / (rank ** skew) for rank in range(1, size + 1)))
+
 class Command(BaseCommand):
-    help = "Populates the database with sample data."
-
-    def handle(self, *args, **kwargs):
-        # Create sample users
-        for _ in range(10):
-            user = User.objects.create_user(
-                username=fake.user_name(),
-                password="password",
-                phone_number=fake.phone_number(),
-                email=fake.email(),
-                name=fake.name()
+    help = "Populates the database with a reproducible synthetic dataset."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=10)
+        parser.add_argument('--contacts-per-user', type=int, default=5)
+        parser.add_argument('--spam-reports', type=int, default=15, help="Total spam reports filed by the generated users.")
+        parser.add_argument('--spam-numbers', type=int, help="Distinct numbers that receive reports (default: 1%% of the contacts).")
+        parser.add_argument('--name-pool', type=int, default=500, help="First and last names to draw from.")
+        parser.add_argument('--name-skew', type=float, default=1.0, help="Zipf exponent of name popularity (0 = uniform).")
+        parser.add_argument('--spam-skew', type=float, default=1.2, help="Zipf exponent of reports per spam number (0 = uniform).")
+        parser.add_argument('--registered-ratio', type=float, default=0.2, help="Share of contacts that are registered users.")
+        parser.add_argument('--seed', type=int, default=42)
+        parser.add_argument('--batch-size', type=int, default=5000)
+        parser.add_argument('--skip-search-index', action='store_true', help="Leave the name index to rebuild_search_index.")
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        self.random = random.Random(options['seed'])
+        Faker.seed(options['seed'])
+        self.batch_size = options['batch_size']
+        self.index_names = not options['skip_search_index']
+
+        pool_size = options['name_pool']
+        self.first_names = [fake.first_name() for _ in range(pool_size)]
+        self.last_names = [fake.last_name() for _ in range(pool_size)]
+        self.name_weights = zipf_weights(pool_size, options['name_skew'])
+
+        start = User.objects.count()
+        total_users = start + options['users']
+        if not 0 <= options['registered_ratio'] <= 1:
+            raise CommandError("--registered-ratio must be between 0 and 1.")
+        if options['registered_ratio'] == 1 and options['contacts_per_user'] > total_users:
+            # Every contact is a distinct registered user's number.
+            raise CommandError(
+                f"--contacts-per-user {options['contacts_per_user']} needs at least as many users with "
+                f"--registered-ratio 1; there will be {total_users}."
             )
+        contacts = options['users'] * options['contacts_per_user']
+        self.external_numbers = max(contacts, 1)
 
-            # Create contacts
-            for _ in range(5):
-                Contact.objects.create(
-                    owner=user,
-                    name=fake.name(),
-                    phone_number=fake.phone_number()
-                )
+        password = make_password("password")
+        user_ids = []
+        for offset in range(start, total_users, self.batch_size):
+            indexes = range(offset, min(offset + self.batch_size, total_users))
+            users = self.create_users(indexes, password)
+            user_ids.extend(user.id for user in users)
+            self.create_contacts(users, options['contacts_per_user'], total_users, options['registered_ratio'])
+
+        spam_numbers = options['spam_numbers'] or max(1, contacts // 100)
+        reports = self.create_spam_reports(user_ids, options['spam_reports'], spam_numbers, options['spam_skew'])
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Database populated with {options['users']} users, {contacts} contacts and {reports} spam reports "
+            f"in {time.perf_counter() - started:.1f}s."
+        ))
+
+    def phone_number(self, base, index):
+        return f'+1{base + index}'
+
+    def name(self):
+        first, = self.random.choices(self.first_names, cum_weights=self.name_weights)
+        last, = self.random.choices(self.last_names, cum_weights=self.name_weights)
+        return f'{first} {last}'
 
-        # Create spam reports
-        for _ in range(15):
-            SpamReport.objects.create(phone_number=fake.phone_number(), spam_count=random.randint(1, 5))
+    def insert(self, model, objects, field):
+        with transaction.atomic():
+            model.objects.bulk_create(objects, batch_size=self.batch_size)
+            if not connection.features.can_return_rows_from_bulk_insert:
+                objects = list(model.objects.order_by('-id').only('id', 'name')[:len(objects)])
+            if self.index_names:
+                NameSearchTerm.objects.bulk_create(build_terms(field, objects), batch_size=self.batch_size)
+        return objects
+
+    def create_users(self, indexes, password):
+        users = []
+        for index in indexes:
+            phone_number = self.phone_number(USER_NUMBER_BASE, index)
+            users.append(User(
+                username=f'user{index}',
+                password=password,
+                phone_number=phone_number,
+                normalized_phone_number=phone_number,
+                email=f'user{index}@example.com',
+                name=self.name(),
+            ))
+        return self.insert(User, users, 'user_id')
+
+    def create_contacts(self, users, contacts_per_user, total_users, registered_ratio):
+        contacts = []
+        for user in users:
+            phone_numbers = set()
+            while len(phone_numbers) < contacts_per_user:
+                if self.random.random() < registered_ratio:
+                    phone_numbers.add(self.phone_number(USER_NUMBER_BASE, self.random.randrange(total_users)))
+                else:
+                    phone_numbers.add(self.phone_number(EXTERNAL_NUMBER_BASE, self.random.randrange(self.external_numbers)))
+
+            for phone_number in sorted(phone_numbers):
+                contacts.append(Contact(
+                    owner_id=user.id,
+                    name=self.name(),
+                    phone_number=phone_number,
+                    normalized_phone_number=phone_number,
+                ))
+
+            if len(contacts) >= self.batch_size:
+                self.insert(Contact, contacts, 'contact_id')
+                contacts = []
+
+        self.insert(Contact, contacts, 'contact_id')
+
+    def create_spam_reports(self, user_ids, reports, spam_numbers, skew):
+        if not user_ids or not reports:
+            return 0
+
+        weights = zipf_weights(spam_numbers, skew)
+        ranks = self.random.choices(range(spam_numbers), cum_weights=weights, k=reports)
+        counts = Counter(
+            (self.random.choice(user_ids), self.phone_number(EXTERNAL_NUMBER_BASE, rank % self.external_numbers))
+            for rank in ranks
+        )
+
+        rows = list(counts.items())
+        for offset in range(0, len(rows), self.batch_size):
+            batch = rows[offset:offset + self.batch_size]
+            numbers = Counter()
+            for (_, phone_number), count in batch:
+                numbers[phone_number] += count
+
+            now = timezone.now()
+            with transaction.atomic():
+                increment_or_create(
+                    SpamReporters,
+                    conflict_fields=['user_id', 'phone_number'],
+                    rows=[
+                        {
+                            "user_id": user_id,
+                            "phone_number": phone_number,
+                            "report_count": count,
+                            "first_reported_at": now,
+                            "last_reported_at": now,
+                        }
+                        for (user_id, phone_number), count in batch
+                    ],
+                    increments=['report_count'],
+                    updates=['last_reported_at'],
+                )
+                Contact.objects.filter(normalized_phone_number__in=list(numbers), is_spam=False).update(is_spam=True)
+                spam_cache.invalidate(list(numbers))
 
-        self.stdout.write(self.style.SUCCESS("Database populated with sample data."))
\ No newline at end of file
+        reputation.rebuild(batch_size=self.batch_size)
+        return reports
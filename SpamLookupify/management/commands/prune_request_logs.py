@@ -0,0 +1,33 @@
+from django.core.management.base import BaseCommand
+from SpamLookupify.retention import get_config, prune
+
+class Command(BaseCommand):
+    help = (
+        "Deletes request logs past their retention window (REQUEST_LOG_RETENTION in settings), "
+        "archiving them first as gzipped NDJSON per day."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int)
+        parser.add_argument('--pause', type=float, help="Seconds to wait between batches.")
+        parser.add_argument('--archive-dir', help="Overrides ARCHIVE_DIR.")
+        parser.add_argument('--no-archive', action='store_true', help="Delete without archiving.")
+        parser.add_argument('--dry-run', action='store_true', help="Only count the expired rows.")
+
+    def handle(self, *args, **options):
+        config = get_config()
+        if options['batch_size']:
+            config['BATCH_SIZE'] = options['batch_size']
+        if options['pause'] is not None:
+            config['PAUSE'] = options['pause']
+        if options['archive_dir']:
+            config['ARCHIVE_DIR'] = options['archive_dir']
+        if options['no_archive']:
+            config['ARCHIVE_DIR'] = None
+
+        pruned = prune(dry_run=options['dry_run'], config=config)
+
+        verb = "Would prune" if options['dry_run'] else "Pruned"
+        for prefix, rows in pruned.items():
+            self.stdout.write(f"{prefix or '(default)'}: {verb.lower()} {rows} rows.")
+        self.stdout.write(self.style.SUCCESS(f"{verb} {sum(pruned.values())} request logs."))
@@ -0,0 +1,27 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from SpamLookupify.models import User, Contact, NameSearchTerm
+from SpamLookupify.search_index import index_users, index_contacts
+
+class Command(BaseCommand):
+    help = "Rebuilds the name search index for every user and contact."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=2000)
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        NameSearchTerm.objects.all().delete()
+
+        for model, index in ((User, index_users), (Contact, index_contacts)):
+            batch = []
+            for obj in model.objects.only('id', 'name').iterator(chunk_size=batch_size):
+                batch.append(obj)
+                if len(batch) >= batch_size:
+                    with transaction.atomic():
+                        index(batch)
+                    batch = []
+            with transaction.atomic():
+                index(batch)
+
+        self.stdout.write(self.style.SUCCESS(f"Indexed {NameSearchTerm.objects.count()} name terms."))
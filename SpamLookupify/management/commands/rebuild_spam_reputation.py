@@ -0,0 +1,12 @@
+from django.core.management.base import BaseCommand
+from SpamLookupify.reputation import rebuild
+
+class Command(BaseCommand):
+    help = "Recomputes the spam reputation of every reported number from SpamReporters."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=2000)
+
+    def handle(self, *args, **options):
+        rebuilt = rebuild(batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt the reputation of {rebuilt} phone numbers."))
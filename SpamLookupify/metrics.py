@@ -0,0 +1,206 @@
+import threading
+from bisect import bisect_left
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_COUNT_BUCKETS = (1, 2, 5, 10, 20, 50, 100, 200, 500)
+DB_TIME_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5)
+
+class Metric:
+    """
+    Base class for the labelled metrics. Updates go to a dict owned by the calling thread, so
+    the hot path never takes a lock; collection sums the per-thread shards. Shards of threads
+    that have exited are folded into ``_retired`` so totals stay monotonic.
+    """
+    type = None
+
+    def __init__(self, name, help, labelnames=()):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self._local = threading.local()
+        self._shards = []
+        self._retired = {}
+        self._lock = threading.Lock()
+
+    def key(self, labels):
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def shard(self):
+        try:
+            return self._local.shard
+        except AttributeError:
+            shard = self._local.shard = {}
+            with self._lock:
+                self._shards.append((threading.current_thread(), shard))
+            return shard
+
+    def merge(self, total, values):
+        for key, value in values.items():
+            total[key] = total.get(key, 0) + value
+
+    def collect(self):
+        with self._lock:
+            alive = []
+            for thread, shard in self._shards:
+                if thread.is_alive():
+                    alive.append((thread, shard))
+                else:
+                    self.merge(self._retired, shard)
+            self._shards = alive
+
+            total = {}
+            self.merge(total, self._retired)
+            for _, shard in alive:
+                self.merge(total, dict(shard))
+        return total
+
+    def reset(self):
+        with self._lock:
+            for _, shard in self._shards:
+                shard.clear()
+            self._retired = {}
+
+class Counter(Metric):
+    type = 'counter'
+
+    def inc(self, amount=1, **labels):
+        shard = self.shard()
+        key = self.key(labels)
+        shard[key] = shard.get(key, 0) + amount
+
+class Histogram(Metric):
+    """
+    Fixed-bucket histogram. ``buckets`` are the inclusive upper bounds; larger values land
+    in an implicit +Inf bucket. Each label set keeps [bucket counts..., sum, count].
+    """
+    type = 'histogram'
+
+    def __init__(self, name, help, labelnames=(), buckets=LATENCY_BUCKETS):
+        super().__init__(name, help, labelnames)
+        self.buckets = tuple(buckets)
+
+    def observe(self, value, **labels):
+        shard = self.shard()
+        key = self.key(labels)
+        values = shard.get(key)
+        if values is None:
+            values = shard[key] = [0] * (len(self.buckets) + 3)
+        values[bisect_left(self.buckets, value)] += 1
+        values[-2] += value
+        values[-1] += 1
+
+    def merge(self, total, values):
+        for key, counts in values.items():
+            merged = total.setdefault(key, [0] * (len(self.buckets) + 3))
+            for index, count in enumerate(list(counts)):
+                merged[index] += count
+
+    def snapshot(self, counts):
+        cumulative = 0
+        buckets = {}
+        for bound, bucket_count in zip([*self.buckets, '+Inf'], counts):
+            cumulative += bucket_count
+            buckets[str(bound)] = cumulative
+        return {'buckets': buckets, 'sum': counts[-2], 'count': counts[-1]}
+
+class Gauge(Metric):
+    """
+    Gauge whose value is read from ``function`` at collection time.
+    """
+    type = 'gauge'
+
+    def __init__(self, name, help, function):
+        super().__init__(name, help)
+        self.function = function
+
+    def collect(self):
+        return {(): self.function()}
+
+class Registry:
+    def __init__(self):
+        self.metrics = {}
+
+    def register(self, metric):
+        self.metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name, help, labelnames=()):
+        return self.register(Counter(name, help, labelnames))
+
+    def histogram(self, name, help, labelnames=(), buckets=LATENCY_BUCKETS):
+        return self.register(Histogram(name, help, labelnames, buckets))
+
+    def gauge(self, name, help, function):
+        return self.register(Gauge(name, help, function))
+
+    def reset(self):
+        for metric in self.metrics.values():
+            metric.reset()
+
+REGISTRY = Registry()
+
+REQUESTS = REGISTRY.counter('spamlookupify_requests_total', "HTTP requests by view and status code.", ['view', 'method', 'status'])
+REQUEST_LATENCY = REGISTRY.histogram('spamlookupify_request_duration_seconds', "HTTP request latency by view.", ['view'])
+DB_QUERIES = REGISTRY.histogram('spamlookupify_db_queries_per_request', "SQL queries per request by view.", ['view'], QUERY_COUNT_BUCKETS)
+DB_TIME = REGISTRY.histogram('spamlookupify_db_time_seconds', "Time spent in SQL per request by view.", ['view'], DB_TIME_BUCKETS)
+DUPLICATE_QUERIES = REGISTRY.histogram('spamlookupify_db_duplicate_queries_per_request', "Repeated SQL statements per request by view.", ['view'], QUERY_COUNT_BUCKETS)
+SPAM_REPORTS = REGISTRY.counter('spamlookupify_spam_reports_total', "Spam reports recorded.")
+SEARCHES = REGISTRY.counter('spamlookupify_searches_total', "Searches by kind and whether anything was found.", ['kind', 'result'])
+SPAM_CACHE_LOOKUPS = REGISTRY.counter('spamlookupify_spam_cache_lookups_total', "Spam count cache lookups by result.", ['result'])
+
+def spam_cache_hit_ratio():
+    lookups = SPAM_CACHE_LOOKUPS.collect()
+    hits = lookups.get(('hit',), 0)
+    total = hits + lookups.get(('miss',), 0)
+    return hits / total if total else 0
+
+REGISTRY.gauge('spamlookupify_spam_cache_hit_ratio', "Share of spam count lookups served from the cache.", spam_cache_hit_ratio)
+
+def record_queries(endpoint, queries, db_time, duplicates):
+    DB_QUERIES.observe(queries, view=endpoint)
+    DB_TIME.observe(db_time, view=endpoint)
+    DUPLICATE_QUERIES.observe(duplicates, view=endpoint)
+
+def query_stats():
+    stats = {}
+    for field, metric in (('queries', DB_QUERIES), ('db_time_seconds', DB_TIME), ('duplicate_queries', DUPLICATE_QUERIES)):
+        for (endpoint,), counts in metric.collect().items():
+            stats.setdefault(endpoint, {})[field] = metric.snapshot(counts)
+    return dict(sorted(stats.items()))
+
+def reset():
+    REGISTRY.reset()
+
+def format_value(value):
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value))
+
+def escape_label_value(value):
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+def format_labels(names, values, extra=()):
+    pairs = [*zip(names, values), *extra]
+    if not pairs:
+        return ''
+    return '{' + ','.join(f'{name}="{escape_label_value(value)}"' for name, value in pairs) + '}'
+
+def render(registry=REGISTRY):
+    """
+    The registry in the Prometheus text exposition format (version 0.0.4).
+    """
+    lines = []
+    for metric in registry.metrics.values():
+        lines.append(f'# HELP {metric.name} {metric.help}')
+        lines.append(f'# TYPE {metric.name} {metric.type}')
+        for key, value in sorted(metric.collect().items()):
+            if metric.type != 'histogram':
+                lines.append(f'{metric.name}{format_labels(metric.labelnames, key)} {format_value(value)}')
+                continue
+
+            snapshot = metric.snapshot(value)
+            for bound, count in snapshot['buckets'].items():
+                lines.append(f'{metric.name}_bucket{format_labels(metric.labelnames, key, [("le", bound)])} {format_value(count)}')
+            lines.append(f'{metric.name}_sum{format_labels(metric.labelnames, key)} {format_value(snapshot["sum"])}')
+            lines.append(f'{metric.name}_count{format_labels(metric.labelnames, key)} {format_value(snapshot["count"])}')
+    return '\n'.join(lines) + '\n'
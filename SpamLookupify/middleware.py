@@ -1,7 +1,28 @@
+import logging
+import time
+from collections import Counter
+from contextlib import ExitStack
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.db import connections
+from django.http import HttpResponse
 from django.utils.deprecation import MiddlewareMixin
+from .hashers import PasswordHashingBusy
 from .models import RequestLog
+from .request_log import log_request
+from . import metrics
 import json
 
+logger = logging.getLogger(__name__)
+
+QUERY_INSTRUMENTATION_DEFAULTS = {
+    'ENABLED': True,
+    # Adds Server-Timing, X-DB-Query-Count and X-DB-Duplicate-Queries to every response.
+    'HEADERS': True,
+    # Log a warning when a request repeats the same SQL statement this many extra times.
+    'DUPLICATE_WARNING_THRESHOLD': 10,
+}
+
 class CSRFCookieMiddleware(MiddlewareMixin):
     def process_request(self, request):
 
@@ -9,10 +30,16 @@ class CSRFCookieMiddleware(MiddlewareMixin):
         if csrf_token:
             request.META['HTTP_X_CSRFTOKEN'] = csrf_token
 
+class PasswordHashingBusyMiddleware(MiddlewareMixin):
+    """
+    Answers PasswordHashingBusy raised outside the API, e.g. by the admin login, with a 503.
+    """
+    def process_exception(self, request, exception):
+        if isinstance(exception, PasswordHashingBusy):
+            return HttpResponse(str(exception), status=503, content_type='text/plain; charset=utf-8')
+
 class RequestLoggingMiddleware(MiddlewareMixin):
     def process_request(self, request):
-        user = request.user if request.user.is_authenticated else None
-
         if request.method == 'POST':
             try:
                 data = request.POST.dict()
@@ -23,9 +50,136 @@ class RequestLoggingMiddleware(MiddlewareMixin):
         else:
             data = request.GET.dict()
 
-        RequestLog.objects.create(
-            user=user,
+        request._request_log = RequestLog(
             request_type=request.method,
             request_path=request.path,
             data=data
-        )
\ No newline at end of file
+        )
+
+    def process_response(self, request, response):
+        # The user is read after the view so that token-authenticated requests, which DRF
+        # authenticates inside the view, are attributed too.
+        entry = getattr(request, '_request_log', None)
+        if entry is not None:
+            user = getattr(request, 'user', None)
+            entry.user = user if user is not None and user.is_authenticated else None
+            log_request(entry)
+        return response
+
+class AsyncCapableMiddleware:
+    """
+    Base for middleware that runs natively under both WSGI and ASGI, so async views are not
+    pushed onto a thread. Subclasses implement ``handle`` for the sync chain and ``__acall__``
+    for the async one.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        return self.handle(request)
+
+class MetricsMiddleware(AsyncCapableMiddleware):
+    def handle(self, request):
+        started = time.perf_counter()
+        response = self.get_response(request)
+        return self.record(request, response, started)
+
+    async def __acall__(self, request):
+        started = time.perf_counter()
+        response = await self.get_response(request)
+        return self.record(request, response, started)
+
+    def record(self, request, response, started):
+        match = request.resolver_match
+        view = match.view_name if match else 'unresolved'
+        metrics.REQUEST_LATENCY.observe(time.perf_counter() - started, view=view)
+        metrics.REQUESTS.inc(view=view, method=request.method, status=response.status_code)
+
+        return response
+
+class QueryRecorder:
+    """
+    ``execute_wrapper`` that counts the queries and DB time of a request. Statements are
+    compared without their parameters, so an N+1 loop shows up as duplicates.
+    """
+    def __init__(self):
+        self.count = 0
+        self.duration = 0.0
+        self.statements = Counter()
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.duration += time.perf_counter() - started
+            self.count += 1
+            self.statements[sql] += 1
+
+    @property
+    def duplicates(self):
+        return sum(count - 1 for count in self.statements.values())
+
+class QueryInstrumentationMiddleware(AsyncCapableMiddleware):
+    def __init__(self, get_response):
+        super().__init__(get_response)
+        self.config = {**QUERY_INSTRUMENTATION_DEFAULTS, **getattr(settings, 'QUERY_INSTRUMENTATION', {})}
+
+    def install(self, stack, recorder):
+        for connection in connections.all():
+            stack.enter_context(connection.execute_wrapper(recorder))
+
+    def handle(self, request):
+        if not self.config['ENABLED']:
+            return self.get_response(request)
+
+        recorder = QueryRecorder()
+        with ExitStack() as stack:
+            self.install(stack, recorder)
+            response = self.get_response(request)
+
+        return self.report(request, response, recorder)
+
+    async def __acall__(self, request):
+        if not self.config['ENABLED']:
+            return await self.get_response(request)
+
+        # The async ORM runs queries on the request's thread-sensitive worker thread, which is
+        # where the wrappers have to be installed.
+        recorder = QueryRecorder()
+        stack = ExitStack()
+        await sync_to_async(self.install)(stack, recorder)
+        try:
+            response = await self.get_response(request)
+        finally:
+            await sync_to_async(stack.close)()
+
+        return self.report(request, response, recorder)
+
+    def report(self, request, response, recorder):
+        match = request.resolver_match
+        endpoint = match.view_name if match else 'unresolved'
+        duplicates = recorder.duplicates
+        metrics.record_queries(endpoint, recorder.count, recorder.duration, duplicates)
+
+        if duplicates >= self.config['DUPLICATE_WARNING_THRESHOLD']:
+            statement, count = recorder.statements.most_common(1)[0]
+            logger.warning(
+                "%s ran %d duplicate queries; repeated %d times: %s",
+                endpoint, duplicates, count, statement,
+            )
+
+        if self.config['HEADERS']:
+            response['Server-Timing'] = f'db;dur={recorder.duration * 1000:.2f};desc="{recorder.count} queries"'
+            response['X-DB-Query-Count'] = str(recorder.count)
+            response['X-DB-Duplicate-Queries'] = str(duplicates)
+
+        return response
@@ -0,0 +1,55 @@
+# Generated by Django 5.1.2 on 2026-10-18 09:57
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+# A frozen copy of search_index.name_terms as of this migration.
+TERM_LENGTH = 16
+
+
+def name_terms(name):
+    normalized = ' '.join((name or '').casefold().split())
+    return [
+        (normalized[offset:offset + TERM_LENGTH], offset)
+        for offset in range(len(normalized))
+        if normalized[offset] != ' '
+    ]
+
+
+def build_name_index(apps, schema_editor):
+    NameSearchTerm = apps.get_model('SpamLookupify', 'NameSearchTerm')
+
+    for model_name, field in (('User', 'user_id'), ('Contact', 'contact_id')):
+        model = apps.get_model('SpamLookupify', model_name)
+        terms = []
+        for pk, name in model.objects.values_list('pk', 'name').iterator(chunk_size=2000):
+            terms.extend(NameSearchTerm(term=term, offset=offset, **{field: pk}) for term, offset in name_terms(name))
+            if len(terms) >= 5000:
+                NameSearchTerm.objects.bulk_create(terms)
+                terms = []
+        NameSearchTerm.objects.bulk_create(terms)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('SpamLookupify', '0019_alter_contact_id_alter_requestlog_id_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='NameSearchTerm',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('term', models.CharField(max_length=16)),
+                ('offset', models.PositiveSmallIntegerField()),
+                ('contact', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='name_terms', to='SpamLookupify.contact')),
+                ('user', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='name_terms', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['term', 'offset'], name='namesearchterm_term_offset')],
+            },
+        ),
+        migrations.RunPython(build_name_index, migrations.RunPython.noop),
+    ]
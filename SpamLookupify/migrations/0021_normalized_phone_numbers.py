@@ -0,0 +1,80 @@
+# Generated by Django 5.1.2 on 2026-10-18 10:06
+
+import re
+
+import django.core.validators
+from django.conf import settings
+from django.db import migrations, models
+
+# A frozen copy of phone.normalize_phone_number as of this migration.
+SEPARATORS = re.compile(r'[\s\-().]')
+DIGITS = re.compile(r'^\d{7,15}$')
+
+
+def normalize_phone_number(phone_number, default_country_code):
+    number = SEPARATORS.sub('', phone_number or '')
+
+    if number.startswith('+'):
+        digits = number[1:]
+    elif number.startswith('00'):
+        digits = number[2:]
+    elif number.startswith(default_country_code):
+        digits = number
+    elif number.startswith('0'):
+        digits = default_country_code + number[1:]
+    else:
+        digits = default_country_code + number
+
+    if not DIGITS.match(digits):
+        return None
+
+    return '+' + digits
+
+
+def backfill_normalized_phone_numbers(apps, schema_editor):
+    # Without it, existing users and contacts are missing from phone number search until
+    # normalize_phone_numbers runs. That command still merges differently spelled spam counters.
+    default_country_code = getattr(settings, 'PHONE_DEFAULT_COUNTRY_CODE', '1')
+
+    for model_name in ('User', 'Contact'):
+        model = apps.get_model('SpamLookupify', model_name)
+        last_id = 0
+        while True:
+            batch = list(model.objects.filter(id__gt=last_id).order_by('id').only('id', 'phone_number')[:2000])
+            if not batch:
+                break
+            for obj in batch:
+                obj.normalized_phone_number = normalize_phone_number(obj.phone_number, default_country_code) or ''
+            model.objects.bulk_update(batch, ['normalized_phone_number'])
+            last_id = batch[-1].id
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('SpamLookupify', '0020_namesearchterm'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='contact',
+            name='normalized_phone_number',
+            field=models.CharField(blank=True, db_index=True, editable=False, max_length=16),
+        ),
+        migrations.AddField(
+            model_name='user',
+            name='normalized_phone_number',
+            field=models.CharField(blank=True, db_index=True, editable=False, max_length=16),
+        ),
+        migrations.AlterField(
+            model_name='spamreport',
+            name='phone_number',
+            field=models.CharField(max_length=16, unique=True, validators=[django.core.validators.RegexValidator(regex='^\\+?1?\\d{9,15}$')]),
+        ),
+        migrations.AlterField(
+            model_name='spamreporters',
+            name='phone_number',
+            field=models.CharField(max_length=16, validators=[django.core.validators.RegexValidator(regex='^\\+?1?\\d{9,15}$')]),
+        ),
+        migrations.RunPython(backfill_normalized_phone_numbers, migrations.RunPython.noop),
+    ]
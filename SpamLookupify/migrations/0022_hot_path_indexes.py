@@ -0,0 +1,34 @@
+# Generated by Django 5.1.2 on 2026-10-18 10:09
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('SpamLookupify', '0021_normalized_phone_numbers'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='contact',
+            name='normalized_phone_number',
+            field=models.CharField(blank=True, editable=False, max_length=16),
+        ),
+        migrations.AddIndex(
+            model_name='contact',
+            index=models.Index(fields=['normalized_phone_number', 'owner'], name='contact_phone_owner'),
+        ),
+        migrations.AddIndex(
+            model_name='requestlog',
+            index=models.Index(fields=['timestamp'], name='requestlog_timestamp'),
+        ),
+        migrations.AddIndex(
+            model_name='requestlog',
+            index=models.Index(fields=['request_path', 'timestamp'], name='requestlog_path_timestamp'),
+        ),
+        migrations.AddIndex(
+            model_name='spamreporters',
+            index=models.Index(fields=['phone_number'], name='spamreporters_phone'),
+        ),
+    ]
@@ -0,0 +1,77 @@
+# Generated by Django 5.1.2 on 2026-10-18 10:23
+
+from datetime import datetime, timezone as dt_timezone
+
+import django.utils.timezone
+from django.conf import settings
+from django.db import migrations, models
+
+# A frozen copy of reputation.aggregate as of this migration: scores are stored relative to
+# EPOCH. 0030 recomputes them in the later format.
+EPOCH = datetime(2024, 1, 1, tzinfo=dt_timezone.utc)
+
+
+def weight(reported_at):
+    half_life = getattr(settings, 'SPAM_REPUTATION_HALF_LIFE_DAYS', 30) * 86400
+    return 2 ** ((reported_at - EPOCH).total_seconds() / half_life)
+
+
+def aggregate(rows, model):
+    reputation = None
+    for phone_number, report_count, first_reported_at, last_reported_at in rows:
+        if reputation is None or reputation.phone_number != phone_number:
+            if reputation is not None:
+                yield reputation
+            reputation = model(
+                phone_number=phone_number,
+                first_reported_at=first_reported_at,
+                last_reported_at=last_reported_at,
+            )
+
+        reputation.distinct_reporters += 1
+        reputation.total_reports += report_count
+        reputation.decayed_score += report_count * weight(first_reported_at + (last_reported_at - first_reported_at) / 2)
+        reputation.first_reported_at = min(reputation.first_reported_at, first_reported_at)
+        reputation.last_reported_at = max(reputation.last_reported_at, last_reported_at)
+
+    if reputation is not None:
+        yield reputation
+
+
+def build_reputations(apps, schema_editor):
+    SpamReporters = apps.get_model('SpamLookupify', 'SpamReporters')
+    SpamReputation = apps.get_model('SpamLookupify', 'SpamReputation')
+
+    rows = SpamReporters.objects.order_by('phone_number').values_list(
+        'phone_number', 'report_count', 'first_reported_at', 'last_reported_at',
+    ).iterator(chunk_size=2000)
+    reputations = []
+    for reputation in aggregate(rows, model=SpamReputation):
+        reputations.append(reputation)
+        if len(reputations) >= 2000:
+            SpamReputation.objects.bulk_create(reputations)
+            reputations = []
+    SpamReputation.objects.bulk_create(reputations)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('SpamLookupify', '0022_hot_path_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SpamReputation',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('phone_number', models.CharField(max_length=16, unique=True)),
+                ('distinct_reporters', models.IntegerField(default=0)),
+                ('total_reports', models.IntegerField(default=0)),
+                ('decayed_score', models.FloatField(default=0)),
+                ('first_reported_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('last_reported_at', models.DateTimeField(default=django.utils.timezone.now)),
+            ],
+        ),
+        migrations.RunPython(build_reputations, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,34 @@
+# Generated by Django 5.1.2 on 2026-10-18 11:02
+
+from django.db import migrations, models
+from django.db.models.functions import TruncDate
+
+
+def fill_days(apps, schema_editor):
+    RequestLog = apps.get_model('SpamLookupify', 'RequestLog')
+    RequestLog.objects.update(day=TruncDate('timestamp'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('SpamLookupify', '0023_spamreputation'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='requestlog',
+            name='day',
+            field=models.DateField(editable=False, null=True),
+        ),
+        migrations.RunPython(fill_days, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='requestlog',
+            name='day',
+            field=models.DateField(editable=False),
+        ),
+        migrations.AddIndex(
+            model_name='requestlog',
+            index=models.Index(fields=['day', 'request_path'], name='requestlog_day_path'),
+        ),
+    ]
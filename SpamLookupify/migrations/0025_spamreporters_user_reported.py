@@ -0,0 +1,17 @@
+# Generated by Django 5.1.2 on 2026-10-18 10:48
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('SpamLookupify', '0024_requestlog_day'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='spamreporters',
+            index=models.Index(fields=['user', 'last_reported_at'], name='spamreporters_user_reported'),
+        ),
+    ]
@@ -0,0 +1,24 @@
+# Generated by Django 5.1.2 on 2026-10-18 10:50
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('SpamLookupify', '0025_spamreporters_user_reported'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='user',
+            name='contacts_modified_at',
+            field=models.DateTimeField(default=django.utils.timezone.now, editable=False),
+        ),
+        migrations.AddField(
+            model_name='user',
+            name='contacts_version',
+            field=models.PositiveBigIntegerField(default=0, editable=False),
+        ),
+    ]
@@ -0,0 +1,21 @@
+# Generated by Django 5.1.2 on 2026-10-18 15:20
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('SpamLookupify', '0026_user_contacts_version'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='namesearchterm',
+            name='namesearchterm_term_offset',
+        ),
+        migrations.AddIndex(
+            model_name='namesearchterm',
+            index=models.Index(fields=['term', 'offset'], name='namesearchterm_term_offset', opclasses=['varchar_pattern_ops', 'int2_ops']),
+        ),
+    ]
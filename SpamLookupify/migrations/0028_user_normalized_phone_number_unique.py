@@ -0,0 +1,35 @@
+# Generated by Django 5.1.2 on 2026-10-18 15:40
+
+from django.db import migrations, models
+from django.db.models import Count, Min
+
+
+def clear_duplicate_numbers(apps, schema_editor):
+    # The first user to register a number keeps it; later registrations of another spelling
+    # are left without a canonical number, as unparsable numbers are.
+    User = apps.get_model('SpamLookupify', 'User')
+    duplicates = (
+        User.objects.exclude(normalized_phone_number='')
+        .values('normalized_phone_number')
+        .annotate(users=Count('id'), first_id=Min('id'))
+        .filter(users__gt=1)
+    )
+    for duplicate in list(duplicates):
+        User.objects.filter(normalized_phone_number=duplicate['normalized_phone_number']).exclude(
+            id=duplicate['first_id']
+        ).update(normalized_phone_number='')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('SpamLookupify', '0027_namesearchterm_pattern_ops'),
+    ]
+
+    operations = [
+        migrations.RunPython(clear_duplicate_numbers, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='user',
+            constraint=models.UniqueConstraint(condition=models.Q(('normalized_phone_number', ''), _negated=True), fields=('normalized_phone_number',), name='user_normalized_phone_number_unique'),
+        ),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 5.1.2 on 2026-10-18 11:10
+
+import django.core.validators
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('SpamLookupify', '0028_user_normalized_phone_number_unique'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='contact',
+            name='phone_number',
+            field=models.CharField(max_length=16, validators=[django.core.validators.RegexValidator(regex='^\\+?1?\\d{9,15}$')]),
+        ),
+    ]
@@ -0,0 +1,72 @@
+# Generated by Django 5.1.2 on 2026-10-18 16:05
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+# A frozen copy of reputation.aggregate as of this migration.
+def decay(score, as_of, at):
+    half_life = getattr(settings, 'SPAM_REPUTATION_HALF_LIFE_DAYS', 30) * 86400
+    return score * 2 ** ((as_of - at) / half_life) if score else 0.0
+
+
+def aggregate(rows, model):
+    reputation = None
+    for phone_number, report_count, first_reported_at, last_reported_at in rows:
+        if reputation is None or reputation.phone_number != phone_number:
+            if reputation is not None:
+                yield reputation
+            reputation = model(
+                phone_number=phone_number,
+                first_reported_at=first_reported_at,
+                last_reported_at=last_reported_at,
+                score_as_of=0.0,
+            )
+
+        reputation.distinct_reporters += 1
+        reputation.total_reports += report_count
+        reported_at = (first_reported_at + (last_reported_at - first_reported_at) / 2).timestamp()
+        if reputation.score_as_of > reported_at:
+            reputation.decayed_score += decay(report_count, reported_at, reputation.score_as_of)
+        else:
+            reputation.decayed_score = decay(reputation.decayed_score, reputation.score_as_of, reported_at) + report_count
+            reputation.score_as_of = reported_at
+        reputation.first_reported_at = min(reputation.first_reported_at, first_reported_at)
+        reputation.last_reported_at = max(reputation.last_reported_at, last_reported_at)
+
+    if reputation is not None:
+        yield reputation
+
+
+def rebuild_reputations(apps, schema_editor):
+    # Scores were stored relative to a fixed epoch; recompute them as of each number's reports.
+    SpamReporters = apps.get_model('SpamLookupify', 'SpamReporters')
+    SpamReputation = apps.get_model('SpamLookupify', 'SpamReputation')
+
+    SpamReputation.objects.all().delete()
+    rows = SpamReporters.objects.order_by('phone_number').values_list(
+        'phone_number', 'report_count', 'first_reported_at', 'last_reported_at',
+    ).iterator(chunk_size=2000)
+    reputations = []
+    for reputation in aggregate(rows, model=SpamReputation):
+        reputations.append(reputation)
+        if len(reputations) >= 2000:
+            SpamReputation.objects.bulk_create(reputations)
+            reputations = []
+    SpamReputation.objects.bulk_create(reputations)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('SpamLookupify', '0029_contact_phone_number_length'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='spamreputation',
+            name='score_as_of',
+            field=models.FloatField(default=0),
+        ),
+        migrations.RunPython(rebuild_reputations, migrations.RunPython.noop),
+    ]
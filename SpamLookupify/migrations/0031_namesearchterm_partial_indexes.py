@@ -0,0 +1,33 @@
+# Generated by Django 5.1.2 on 2026-10-18 12:02
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('SpamLookupify', '0030_spamreputation_score_as_of'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='namesearchterm',
+            name='namesearchterm_term_offset',
+        ),
+        migrations.AddIndex(
+            model_name='namesearchterm',
+            index=models.Index(condition=models.Q(('offset', 0), ('user__isnull', False)), fields=['term', 'offset', 'user'], name='namesearchterm_user_prefix', opclasses=['varchar_pattern_ops', 'int2_ops', 'int8_ops']),
+        ),
+        migrations.AddIndex(
+            model_name='namesearchterm',
+            index=models.Index(condition=models.Q(('offset__gt', 0), ('user__isnull', False)), fields=['term', 'offset', 'user'], name='namesearchterm_user_infix', opclasses=['varchar_pattern_ops', 'int2_ops', 'int8_ops']),
+        ),
+        migrations.AddIndex(
+            model_name='namesearchterm',
+            index=models.Index(condition=models.Q(('contact__isnull', False), ('offset', 0)), fields=['term', 'offset', 'contact'], name='namesearchterm_contact_prefix', opclasses=['varchar_pattern_ops', 'int2_ops', 'int8_ops']),
+        ),
+        migrations.AddIndex(
+            model_name='namesearchterm',
+            index=models.Index(condition=models.Q(('contact__isnull', False), ('offset__gt', 0)), fields=['term', 'offset', 'contact'], name='namesearchterm_contact_infix', opclasses=['varchar_pattern_ops', 'int2_ops', 'int8_ops']),
+        ),
+    ]
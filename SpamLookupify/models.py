@@ -2,15 +2,33 @@ from django.contrib.auth.models import AbstractUser, Group, Permission
 from django.db import models
 from django.core.validators import RegexValidator, EmailValidator
 from django.utils import timezone
+from datetime import timezone as dt_timezone
 import uuid
+from .phone import normalize_phone_number
 
-class User(AbstractUser):
+class NormalizedPhoneNumberMixin:
+    def set_normalized_phone_number(self):
+        self.normalized_phone_number = normalize_phone_number(self.phone_number) or ''
+
+    def save(self, *args, **kwargs):
+        update_fields = kwargs.get('update_fields')
+        if 'phone_number' in self.__dict__ and (update_fields is None or 'phone_number' in update_fields):
+            self.set_normalized_phone_number()
+            if update_fields is not None:
+                kwargs['update_fields'] = {*update_fields, 'normalized_phone_number'}
+        super().save(*args, **kwargs)
+
+class User(NormalizedPhoneNumberMixin, AbstractUser):
     name = models.CharField(max_length=100, blank=True)
     phone_number = models.CharField(
         max_length=15, unique=True,
         validators=[RegexValidator(regex=r'^\+?1?\d{9,15}$')]
     )
+    normalized_phone_number = models.CharField(max_length=16, blank=True, editable=False, db_index=True)
     email = models.EmailField(validators=[EmailValidator(message="Enter a valid email address.")], blank=True, null=True)
+    # Bumped on every write to the user's contacts; the ETag and Last-Modified of /api/contacts/.
+    contacts_version = models.PositiveBigIntegerField(default=0, editable=False)
+    contacts_modified_at = models.DateTimeField(default=timezone.now, editable=False)
 
     groups = models.ManyToManyField(Group, related_name="custom_user_groups", blank=True)
     user_permissions = models.ManyToManyField(Permission, related_name="custom_user_permissions", blank=True)
@@ -18,30 +36,49 @@ class User(AbstractUser):
     REQUIRED_FIELDS = ['phone_number', 'name']
     USERNAME_FIELD = 'username'
 
-class Contact(models.Model):
+    class Meta(AbstractUser.Meta):
+        constraints = [
+            # Spellings of one number share a canonical form; only one user may register it.
+            models.UniqueConstraint(
+                fields=['normalized_phone_number'], condition=~models.Q(normalized_phone_number=''),
+                name='user_normalized_phone_number_unique',
+            ),
+        ]
+
+class Contact(NormalizedPhoneNumberMixin, models.Model):
     owner = models.ForeignKey(User, on_delete=models.CASCADE, related_name="contacts")
     name = models.CharField(max_length=100)
+    # Long enough for the canonical form, which anonymous spam report contacts store.
     phone_number = phone_number = models.CharField(
-        max_length=15,
+        max_length=16,
         validators=[RegexValidator(regex=r'^\+?1?\d{9,15}$')]
     )
+    normalized_phone_number = models.CharField(max_length=16, blank=True, editable=False)
     is_spam = models.BooleanField(default=False)
     is_anonymous = models.BooleanField(default=False)
 
     class Meta:
         unique_together = ['owner', 'phone_number']
+        indexes = [
+            models.Index(fields=['normalized_phone_number', 'owner'], name='contact_phone_owner'),
+        ]
 
 class SpamReport(models.Model):
+    """
+    Deprecated: no longer written by spam reports. SpamReputation.total_reports holds the count
+    per number; existing rows are kept until the table is dropped.
+    """
+    # Stored in the canonical form returned by normalize_phone_number.
     phone_number = models.CharField(
-        max_length=15, unique=True,
+        max_length=16, unique=True,
         validators=[RegexValidator(regex=r'^\+?1?\d{9,15}$')]
     )
     spam_count = models.IntegerField(default=0)
     last_reported_at = models.DateTimeField(auto_now=True)
 
     def increment_spam_count(self):
-        self.spam_count += 1
-        self.save()
+        SpamReport.objects.filter(pk=self.pk).update(spam_count=models.F('spam_count') + 1, last_reported_at=timezone.now())
+        self.refresh_from_db(fields=['spam_count', 'last_reported_at'])
 
 class RequestLog(models.Model):
     user = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True)
@@ -49,6 +86,22 @@ class RequestLog(models.Model):
     timestamp = models.DateTimeField(default=timezone.now)
     data = models.JSONField()
     request_path = models.CharField(max_length=255, default='/unknown')
+    # UTC day of the timestamp: retention and archiving work on whole days.
+    day = models.DateField(editable=False)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['timestamp'], name='requestlog_timestamp'),
+            models.Index(fields=['request_path', 'timestamp'], name='requestlog_path_timestamp'),
+            models.Index(fields=['day', 'request_path'], name='requestlog_day_path'),
+        ]
+
+    def set_day(self):
+        self.day = self.timestamp.astimezone(dt_timezone.utc).date()
+
+    def save(self, *args, **kwargs):
+        self.set_day()
+        super().save(*args, **kwargs)
 
     def __str__(self):
         user_display = self.user.username if self.user else "Anonymous"
@@ -56,8 +109,9 @@ class RequestLog(models.Model):
     
 class SpamReporters(models.Model):
     user = models.ForeignKey(User, on_delete=models.CASCADE)
+    # Stored in the canonical form returned by normalize_phone_number.
     phone_number = phone_number = models.CharField(
-        max_length=15,
+        max_length=16,
         validators=[RegexValidator(regex=r'^\+?1?\d{9,15}$')]
     )
     report_count = models.IntegerField(default=0)
@@ -66,7 +120,53 @@ class SpamReporters(models.Model):
 
     class Meta:
         unique_together = ('user', 'phone_number')
+        indexes = [
+            models.Index(fields=['phone_number'], name='spamreporters_phone'),
+            models.Index(fields=['user', 'last_reported_at'], name='spamreporters_user_reported'),
+        ]
 
     def increment_report_count(self):
-        self.report_count += 1
-        self.save()
\ No newline at end of file
+        SpamReporters.objects.filter(pk=self.pk).update(report_count=models.F('report_count') + 1, last_reported_at=timezone.now())
+        self.refresh_from_db(fields=['report_count', 'last_reported_at'])
+
+class SpamReputation(models.Model):
+    # Stored in the canonical form returned by normalize_phone_number.
+    phone_number = models.CharField(max_length=16, unique=True)
+    distinct_reporters = models.IntegerField(default=0)
+    total_reports = models.IntegerField(default=0)
+    # Sum of 2 ** ((reported_at - score_as_of) / half-life) over all reports: the score at
+    # score_as_of (Unix seconds). A new report decays it to its own time before adding 1; see
+    # reputation.current_score for the score at a given time.
+    decayed_score = models.FloatField(default=0)
+    score_as_of = models.FloatField(default=0)
+    first_reported_at = models.DateTimeField(default=timezone.now)
+    last_reported_at = models.DateTimeField(default=timezone.now)
+
+class NameSearchTerm(models.Model):
+    term = models.CharField(max_length=16)
+    offset = models.PositiveSmallIntegerField()
+    user = models.ForeignKey(User, on_delete=models.CASCADE, null=True, blank=True, related_name="name_terms")
+    contact = models.ForeignKey(Contact, on_delete=models.CASCADE, null=True, blank=True, related_name="name_terms")
+
+    class Meta:
+        # Every row is in exactly one of these covering indexes, split by user or contact and by
+        # prefix (offset 0) or infix term, so that each search stage scans only its own rows.
+        # The opclasses only apply on PostgreSQL; see search_index.matching_terms.
+        indexes = [
+            models.Index(
+                fields=['term', 'offset', 'user'], condition=models.Q(user__isnull=False, offset=0),
+                name='namesearchterm_user_prefix', opclasses=['varchar_pattern_ops', 'int2_ops', 'int8_ops'],
+            ),
+            models.Index(
+                fields=['term', 'offset', 'user'], condition=models.Q(user__isnull=False, offset__gt=0),
+                name='namesearchterm_user_infix', opclasses=['varchar_pattern_ops', 'int2_ops', 'int8_ops'],
+            ),
+            models.Index(
+                fields=['term', 'offset', 'contact'], condition=models.Q(contact__isnull=False, offset=0),
+                name='namesearchterm_contact_prefix', opclasses=['varchar_pattern_ops', 'int2_ops', 'int8_ops'],
+            ),
+            models.Index(
+                fields=['term', 'offset', 'contact'], condition=models.Q(contact__isnull=False, offset__gt=0),
+                name='namesearchterm_contact_infix', opclasses=['varchar_pattern_ops', 'int2_ops', 'int8_ops'],
+            ),
+        ]
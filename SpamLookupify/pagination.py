@@ -0,0 +1,107 @@
+from django.conf import settings
+from django.core import signing
+from rest_framework.exceptions import ValidationError
+from rest_framework.utils.urls import replace_query_param
+
+CURSOR_SALT = 'SpamLookupify.search-cursor'
+
+def get_page_size(request):
+    default_size = getattr(settings, 'SEARCH_PAGE_SIZE', 50)
+    max_size = getattr(settings, 'SEARCH_MAX_PAGE_SIZE', 500)
+
+    limit = request.GET.get('limit')
+    if limit is None:
+        return default_size
+
+    try:
+        limit = int(limit)
+    except ValueError:
+        limit = 0
+
+    if limit < 1:
+        raise ValidationError({"error": "limit must be a positive integer."})
+
+    return min(limit, max_size)
+
+def encode_cursor(position):
+    return signing.dumps(position, salt=CURSOR_SALT, compress=True)
+
+def decode_cursor(request, stage_count):
+    cursor = request.GET.get('cursor')
+    if not cursor:
+        return None
+
+    try:
+        stage, last_id = signing.loads(cursor, salt=CURSOR_SALT)
+    except (signing.BadSignature, TypeError, ValueError):
+        raise ValidationError({"error": "Invalid cursor."})
+
+    if not isinstance(stage, int) or not isinstance(last_id, int) or not 0 <= stage < stage_count:
+        raise ValidationError({"error": "Invalid cursor."})
+
+    return stage, last_id
+
+def paginate_stages(stages, position, limit):
+    """
+    Keyset pagination over a sequence of querysets read one after another.
+
+    Every stage must be ordered by ``id`` and yield rows exposing an ``id`` key.
+    The returned cursor position is ``(stage, last_id)`` or ``None`` once every
+    stage is exhausted.
+    """
+    rows = []
+    start_stage, last_id = position or (0, 0)
+
+    for stage in range(start_stage, len(stages)):
+        queryset = stages[stage]
+        if stage == start_stage and last_id:
+            queryset = queryset.filter(id__gt=last_id)
+
+        remaining = limit - len(rows)
+        page = list(queryset[:remaining + 1])
+
+        if len(page) > remaining:
+            if not remaining:
+                return rows, (stage, 0)
+
+            rows.extend(page[:remaining])
+            return rows, (stage, rows[-1]['id'])
+
+        rows.extend(page)
+
+    return rows, None
+
+async def apaginate_stages(stages, position, limit):
+    """
+    paginate_stages for async views, reading the stages with async iteration.
+    """
+    rows = []
+    start_stage, last_id = position or (0, 0)
+
+    for stage in range(start_stage, len(stages)):
+        queryset = stages[stage]
+        if stage == start_stage and last_id:
+            queryset = queryset.filter(id__gt=last_id)
+
+        remaining = limit - len(rows)
+        page = [row async for row in queryset[:remaining + 1]]
+
+        if len(page) > remaining:
+            if not remaining:
+                return rows, (stage, 0)
+
+            rows.extend(page[:remaining])
+            return rows, (stage, rows[-1]['id'])
+
+        rows.extend(page)
+
+    return rows, None
+
+def paginated_response(request, response, next_position):
+    if next_position is not None:
+        cursor = encode_cursor(next_position)
+        next_url = replace_query_param(request.build_absolute_uri(), 'cursor', cursor)
+        response['X-Next-Cursor'] = cursor
+        response['Link'] = f'<{next_url}>; rel="next"'
+
+    return response
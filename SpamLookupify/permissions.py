@@ -1,4 +1,7 @@
+from django.conf import settings
+from django.utils.crypto import constant_time_compare
 from rest_framework import permissions
+from rest_framework.authentication import get_authorization_header
 from rest_framework.exceptions import PermissionDenied
 
 class IsOwnerOrReadOnly(permissions.BasePermission):
@@ -6,4 +9,18 @@ class IsOwnerOrReadOnly(permissions.BasePermission):
         if obj.owner == request.user or request.method in permissions.SAFE_METHODS:
             return True
         
-        raise PermissionDenied("The requested object does not belong to you.")
\ No newline at end of file
+        raise PermissionDenied("The requested object does not belong to you.")
+
+class IsMetricsScraper(permissions.BasePermission):
+    """
+    Staff users and scrapers sending ``Authorization: Bearer <METRICS_TOKEN>``. Clients listed in
+    METRICS_ALLOWED_IPS are let in too; that list is empty unless configured, since behind a
+    reverse proxy every client has the proxy's address.
+    """
+    def has_permission(self, request, view):
+        if request.user and request.user.is_staff:
+            return True
+        token = getattr(settings, 'METRICS_TOKEN', None)
+        if token and constant_time_compare(get_authorization_header(request), f'Bearer {token}'.encode()):
+            return True
+        return request.META.get('REMOTE_ADDR') in getattr(settings, 'METRICS_ALLOWED_IPS', [])
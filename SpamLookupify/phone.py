@@ -0,0 +1,35 @@
+import re
+from django.conf import settings
+
+SEPARATORS = re.compile(r'[\s\-().]')
+DIGITS = re.compile(r'^\d{7,15}$')
+
+def normalize_phone_number(phone_number, default_country_code=None):
+    """
+    Canonical E.164-style form of ``phone_number`` (``+`` followed by digits), or ``None``
+    when it cannot be parsed.
+
+    ``+`` and ``00`` prefixes mark international numbers. Other numbers are treated as
+    international when they already start with the default country code, lose their
+    trunk ``0`` otherwise and get the default country code prepended.
+    """
+    if default_country_code is None:
+        default_country_code = getattr(settings, 'PHONE_DEFAULT_COUNTRY_CODE', '1')
+
+    number = SEPARATORS.sub('', phone_number or '')
+
+    if number.startswith('+'):
+        digits = number[1:]
+    elif number.startswith('00'):
+        digits = number[2:]
+    elif number.startswith(default_country_code):
+        digits = number
+    elif number.startswith('0'):
+        digits = default_country_code + number[1:]
+    else:
+        digits = default_country_code + number
+
+    if not DIGITS.match(digits):
+        return None
+
+    return '+' + digits
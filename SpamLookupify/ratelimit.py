@@ -1,21 +1,130 @@
-from rest_framework.throttling import UserRateThrottle
+import time
+from django.conf import settings
+from django.core.cache import caches
+from rest_framework.throttling import BaseThrottle
 
-class RegisterThrottle(UserRateThrottle):
-    rate = '10/hour'  
+DEFAULTS = {
+    'ENABLED': True,
+    # Point this cache at Redis or Memcached so every worker process shares the counters.
+    'CACHE': 'throttle',
+    'KEY_PREFIX': 'throttle',
+}
 
-class LoginThrottle(UserRateThrottle):
-    rate = '5/minute' 
+DURATIONS = {'s': 1, 'm': 60, 'h': 3600, 'd': 86400}
 
-class LogoutThrottle(UserRateThrottle):
+def get_config():
+    return {**DEFAULTS, **getattr(settings, 'RATELIMIT', {})}
+
+def parse_rate(rate):
+    """
+    '10/minute' -> (10, 60)
+    """
+    count, period = rate.split('/')
+    return int(count), DURATIONS[period[0]]
+
+class SlidingWindowThrottle(BaseThrottle):
+    """
+    Sliding-window counter throttle. Each window keeps two counters per client, the current
+    and the previous fixed window, and the request count over the last ``duration`` seconds is
+    estimated by weighting the previous window by how much of it still overlaps. Every limit
+    in ``rate`` and ``day_rate`` must hold; a rejected request is not counted, so a client
+    retrying after Retry-After gets through.
+    """
+    rate = None
+    day_rate = None
+    timer = time.time
+
+    def __init__(self):
+        self.limits = [parse_rate(rate) for rate in (self.rate, self.day_rate) if rate]
+        self.retry_after = None
+
+    def get_scope(self):
+        return type(self).__name__.lower()
+
+    def get_client(self, request):
+        if request.user and request.user.is_authenticated:
+            return f'user:{request.user.pk}'
+        return f'ip:{self.get_ident(request)}'
+
+    def is_exempt(self, request):
+        return False
+
+    def allow_request(self, request, view):
+        config = get_config()
+        if not config['ENABLED'] or not self.limits or self.is_exempt(request):
+            return True
+
+        cache = caches[config['CACHE']]
+        now = self.timer()
+        prefix = f"{config['KEY_PREFIX']}:{self.get_scope()}:{self.get_client(request)}"
+
+        windows = []
+        for limit, duration in self.limits:
+            window = int(now // duration)
+            windows.append((limit, duration, f'{prefix}:{duration}:{window}', f'{prefix}:{duration}:{window - 1}'))
+        previous_counts = cache.get_many([previous for *_, previous in windows])
+
+        self.retry_after = None
+        counted = []
+        for limit, duration, current, previous in windows:
+            count = 1
+            if not cache.add(current, count, timeout=2 * duration + 1):
+                try:
+                    count = cache.incr(current)
+                except ValueError:
+                    # Expired between add() and incr().
+                    cache.set(current, count, timeout=2 * duration + 1)
+            counted.append(current)
+
+            previous_count = previous_counts.get(previous, 0)
+            elapsed = (now % duration) / duration
+            # Rounded so that float error does not reject a retry made exactly at wait().
+            if round(previous_count * (1 - elapsed) + count, 9) > limit:
+                self.retry_after = max(self.retry_after or 0, self.wait_for(limit, duration, elapsed, count - 1, previous_count))
+
+        if self.retry_after is not None:
+            for current in counted:
+                try:
+                    cache.decr(current)
+                except ValueError:
+                    pass
+        return self.retry_after is None
+
+    def wait_for(self, limit, duration, elapsed, count, previous_count):
+        """
+        Seconds until one more request fits under ``limit``, given the ``count`` requests
+        already counted in the current window and ``previous_count`` in the previous one.
+        """
+        if count < limit and previous_count:
+            # Later in this window, once enough of the previous one has slid out.
+            return duration * max(0, 1 - (limit - count - 1) / previous_count - elapsed)
+        # In the next window, where this window's requests are the weighted previous count.
+        needed = 1 - (limit - 1) / count if count else 0
+        return duration * (1 - elapsed + max(0, needed))
+
+    def wait(self):
+        return self.retry_after
+
+class RegisterThrottle(SlidingWindowThrottle):
+    rate = '10/hour'
+
+class LoginThrottle(SlidingWindowThrottle):
+    rate = '5/minute'
+
+class LogoutThrottle(SlidingWindowThrottle):
     rate = '20/minute'
 
-class ContactThrottle(UserRateThrottle):
+class ContactThrottle(SlidingWindowThrottle):
     rate = '10/minute'
 
-class ReportSpamThrottle(UserRateThrottle):
+class ReportSpamThrottle(SlidingWindowThrottle):
     rate = '10/minute'
     day_rate = '50/day'
 
-class SearchThrottle(UserRateThrottle):
-    rate = '1/minute'
-    day_rate = '200/day'
\ No newline at end of file
+class ExportThrottle(SlidingWindowThrottle):
+    rate = '10/hour'
+
+class SearchThrottle(SlidingWindowThrottle):
+    # Room for a search and the pages a client follows through X-Next-Cursor.
+    rate = '30/minute'
+    day_rate = '200/day'
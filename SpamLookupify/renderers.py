@@ -0,0 +1,37 @@
+from rest_framework.utils.encoders import JSONEncoder
+from rest_framework.renderers import JSONRenderer
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+_encoder = JSONEncoder()
+
+def dumps(data):
+    """
+    JSON bytes for ``data`` as JSONRenderer writes them: compact, UTF-8 and with U+2028/U+2029
+    escaped. Uses orjson when it is installed; types it does not know, and datetimes (which
+    DRF formats differently), go through DRF's encoder.
+    """
+    if orjson is None:
+        return JSONRenderer().render(data)
+
+    try:
+        rendered = orjson.dumps(data, default=_encoder.default, option=orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_NON_STR_KEYS)
+    except orjson.JSONEncodeError:
+        # Integers beyond 64 bits, among others; the standard library takes them.
+        return JSONRenderer().render(data)
+    return rendered.replace(b'\xe2\x80\xa8', b'\\u2028').replace(b'\xe2\x80\xa9', b'\\u2029')
+
+class FastJSONRenderer(JSONRenderer):
+    """
+    JSONRenderer backed by dumps. Indented output, as requested by the browsable API or an
+    ``indent`` media type parameter, is left to JSONRenderer.
+    """
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        if orjson is None or self.get_indent(accepted_media_type, renderer_context or {}) is not None:
+            return super().render(data, accepted_media_type, renderer_context)
+        return dumps(data)
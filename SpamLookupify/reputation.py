@@ -0,0 +1,117 @@
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.db import transaction
+from django.utils import timezone
+from .models import SpamReporters, SpamReputation
+from .upsert import increment_or_create
+from . import spam_cache
+
+BATCH_SIZE = 2000
+
+def half_life():
+    days = getattr(settings, 'SPAM_REPUTATION_HALF_LIFE_DAYS', 30)
+    if not isinstance(days, (int, float)) or not 0 < days <= 36500:
+        raise ImproperlyConfigured("SPAM_REPUTATION_HALF_LIFE_DAYS must be a number of days between 0 and 36500.")
+    return days * 86400
+
+def decay(score, as_of, at):
+    """
+    ``score``, valid at Unix time ``as_of``, as it stands at Unix time ``at``.
+    """
+    return score * 2 ** ((as_of - at) / half_life()) if score else 0.0
+
+def current_score(decayed_score, score_as_of, now=None):
+    """
+    Reports weighted by age, a report losing half its weight every half-life.
+    """
+    return decay(decayed_score, score_as_of, (now or timezone.now()).timestamp())
+
+def record(counts, new_reporters, now):
+    """
+    Add ``counts`` (phone number -> reports) filed at ``now`` to the reputation rows;
+    ``new_reporters`` are the numbers the reporter had not reported before.
+    """
+    increment_or_create(
+        SpamReputation,
+        conflict_fields=['phone_number'],
+        rows=[
+            {
+                "phone_number": phone_number,
+                "distinct_reporters": int(phone_number in new_reporters),
+                "total_reports": count,
+                "decayed_score": count,
+                "score_as_of": now.timestamp(),
+                "first_reported_at": now,
+                "last_reported_at": now,
+            }
+            for phone_number, count in counts.items()
+        ],
+        increments=['distinct_reporters', 'total_reports'],
+        updates=['last_reported_at'],
+        decay=('decayed_score', 'score_as_of', half_life()),
+    )
+
+def aggregate(rows):
+    """
+    One reputation per phone number from SpamReporters rows sorted by phone number. Only the
+    first and last report of each reporter are known, so their reports are weighted at the
+    midpoint of the two. Scores are kept as of the latest midpoint seen.
+    """
+    reputation = None
+    for phone_number, report_count, first_reported_at, last_reported_at in rows:
+        if reputation is None or reputation.phone_number != phone_number:
+            if reputation is not None:
+                yield reputation
+            reputation = SpamReputation(
+                phone_number=phone_number,
+                first_reported_at=first_reported_at,
+                last_reported_at=last_reported_at,
+                score_as_of=0.0,
+            )
+
+        reputation.distinct_reporters += 1
+        reputation.total_reports += report_count
+        reported_at = (first_reported_at + (last_reported_at - first_reported_at) / 2).timestamp()
+        if reputation.score_as_of > reported_at:
+            reputation.decayed_score += decay(report_count, reported_at, reputation.score_as_of)
+        else:
+            reputation.decayed_score = decay(reputation.decayed_score, reputation.score_as_of, reported_at) + report_count
+            reputation.score_as_of = reported_at
+        reputation.first_reported_at = min(reputation.first_reported_at, first_reported_at)
+        reputation.last_reported_at = max(reputation.last_reported_at, last_reported_at)
+
+    if reputation is not None:
+        yield reputation
+
+def rebuild(phone_numbers=None, batch_size=BATCH_SIZE):
+    """
+    Recompute reputation rows from SpamReporters, for ``phone_numbers`` or for every number.
+    """
+    reporters = SpamReporters.objects.all()
+    reputations = SpamReputation.objects.all()
+    if phone_numbers is not None:
+        reporters = reporters.filter(phone_number__in=phone_numbers)
+        reputations = reputations.filter(phone_number__in=phone_numbers)
+
+    rows = reporters.order_by('phone_number').values_list(
+        'phone_number', 'report_count', 'first_reported_at', 'last_reported_at',
+    ).iterator(chunk_size=batch_size)
+
+    rebuilt = 0
+    with transaction.atomic():
+        reputations.delete()
+        batch = []
+        for reputation in aggregate(rows):
+            batch.append(reputation)
+            if len(batch) >= batch_size:
+                SpamReputation.objects.bulk_create(batch)
+                rebuilt += len(batch)
+                batch = []
+        SpamReputation.objects.bulk_create(batch)
+        rebuilt += len(batch)
+
+    if phone_numbers is None:
+        transaction.on_commit(spam_cache.invalidate_all)
+    else:
+        spam_cache.invalidate(phone_numbers)
+    return rebuilt
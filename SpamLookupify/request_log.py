@@ -0,0 +1,140 @@
+import atexit
+import logging
+import queue
+import threading
+import time
+from django.conf import settings
+from django.db import close_old_connections
+from .models import RequestLog
+
+logger = logging.getLogger(__name__)
+
+DEFAULTS = {
+    # 'async' queues entries for the background writer, 'sync' saves them inside the request.
+    'MODE': 'async',
+    'BATCH_SIZE': 200,
+    'FLUSH_INTERVAL': 1.0,
+    'MAX_QUEUE_SIZE': 10000,
+    # What to do when the queue is full: 'drop' discards the entry, 'block' waits up to BLOCK_TIMEOUT first.
+    'OVERFLOW': 'drop',
+    'BLOCK_TIMEOUT': 0.05,
+}
+
+_writer = None
+_writer_lock = threading.Lock()
+
+def get_config():
+    return {**DEFAULTS, **getattr(settings, 'REQUEST_LOG', {})}
+
+class RequestLogWriter:
+    def __init__(self, batch_size, flush_interval, max_queue_size, overflow='drop', block_timeout=0.05):
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.overflow = overflow
+        self.block_timeout = block_timeout
+        self.queue = queue.Queue(maxsize=max_queue_size)
+        self.dropped = 0
+        self._dropped_lock = threading.Lock()
+        self._stopping = threading.Event()
+        self._thread = None
+
+    def start(self):
+        self._thread = threading.Thread(target=self.run, name='request-log-writer', daemon=True)
+        self._thread.start()
+        atexit.register(self.stop)
+
+    def submit(self, entry):
+        try:
+            if self.overflow == 'block':
+                self.queue.put(entry, timeout=self.block_timeout)
+            else:
+                self.queue.put_nowait(entry)
+        except queue.Full:
+            with self._dropped_lock:
+                self.dropped += 1
+
+    def run(self):
+        # Only the writer thread recycles its connection: flush() also runs on the thread
+        # that stops the writer and must leave that thread's connection alone.
+        while not self._stopping.is_set():
+            batch = self.next_batch()
+            if batch:
+                close_old_connections()
+                self.write(batch)
+        self.flush()
+        close_old_connections()
+
+    def next_batch(self):
+        batch = []
+        deadline = time.monotonic() + self.flush_interval
+
+        while len(batch) < self.batch_size:
+            timeout = deadline - time.monotonic()
+            if timeout <= 0:
+                break
+            try:
+                batch.append(self.queue.get(timeout=timeout))
+            except queue.Empty:
+                break
+
+        return batch
+
+    def flush(self):
+        batch = []
+        while True:
+            try:
+                batch.append(self.queue.get_nowait())
+            except queue.Empty:
+                break
+            if len(batch) >= self.batch_size:
+                self.write(batch)
+                batch = []
+        if batch:
+            self.write(batch)
+
+    def write(self, batch):
+        for entry in batch:
+            entry.set_day()
+        try:
+            RequestLog.objects.bulk_create(batch, batch_size=self.batch_size)
+        except Exception:
+            logger.exception("Failed to write %d request log entries.", len(batch))
+
+    def stop(self, timeout=5):
+        self._stopping.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+
+def get_writer():
+    global _writer
+
+    if _writer is None:
+        with _writer_lock:
+            if _writer is None:
+                config = get_config()
+                writer = RequestLogWriter(
+                    batch_size=config['BATCH_SIZE'],
+                    flush_interval=config['FLUSH_INTERVAL'],
+                    max_queue_size=config['MAX_QUEUE_SIZE'],
+                    overflow=config['OVERFLOW'],
+                    block_timeout=config['BLOCK_TIMEOUT'],
+                )
+                writer.start()
+                _writer = writer
+
+    return _writer
+
+def log_request(entry):
+    if get_config()['MODE'] == 'sync':
+        entry.save()
+    else:
+        get_writer().submit(entry)
+
+def stop_writer():
+    global _writer
+
+    with _writer_lock:
+        if _writer is not None:
+            _writer.stop()
+            _writer = None
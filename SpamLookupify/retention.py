@@ -0,0 +1,102 @@
+import gzip
+import json
+import time
+from datetime import timedelta
+from pathlib import Path
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.utils import timezone
+from .models import RequestLog
+
+DEFAULTS = {
+    'DEFAULT_DAYS': 30,
+    # request_path prefix -> days to keep. The longest matching prefix wins.
+    'PATHS': {},
+    # Expired rows are appended to <ARCHIVE_DIR>/requestlog-<day>.ndjson.gz before they are
+    # deleted. None deletes without archiving.
+    'ARCHIVE_DIR': None,
+    # Each batch is deleted with its own DELETE statement; PAUSE seconds between batches let
+    # request log writes through on databases that lock the whole table.
+    'BATCH_SIZE': 5000,
+    'PAUSE': 0.0,
+}
+
+FIELDS = ('id', 'user_id', 'request_type', 'request_path', 'timestamp', 'day', 'data')
+
+def get_config():
+    return {**DEFAULTS, **getattr(settings, 'REQUEST_LOG_RETENTION', {})}
+
+def retention_rules(config):
+    """
+    [(prefix, days)] from the most to the least specific, ending with the default ('', days).
+    """
+    rules = sorted(config['PATHS'].items(), key=lambda rule: len(rule[0]), reverse=True)
+    return [*rules, ('', config['DEFAULT_DAYS'])]
+
+def expired(prefix, days, rules, today):
+    """
+    Rows under ``prefix`` older than ``days`` full days, leaving out the paths that a more
+    specific rule governs.
+    """
+    logs = RequestLog.objects.filter(day__lt=today - timedelta(days=days))
+    if prefix:
+        logs = logs.filter(request_path__startswith=prefix)
+
+    for other, _ in rules:
+        if len(other) > len(prefix) and other.startswith(prefix):
+            logs = logs.exclude(request_path__startswith=other)
+
+    return logs
+
+def archive(rows, archive_dir):
+    by_day = {}
+    for row in rows:
+        by_day.setdefault(row['day'], []).append(row)
+
+    archive_dir.mkdir(parents=True, exist_ok=True)
+    for day, day_rows in by_day.items():
+        # Appending adds a gzip member per batch; gzip readers see one continuous stream.
+        with gzip.open(archive_dir / f'requestlog-{day.isoformat()}.ndjson.gz', 'at', encoding='utf-8') as archive_file:
+            for row in day_rows:
+                archive_file.write(json.dumps(row, cls=DjangoJSONEncoder, separators=(',', ':')) + '\n')
+
+def prune(today=None, dry_run=False, config=None):
+    """
+    Archive and delete the expired request logs in batches. Returns {prefix: rows} with the
+    number of rows pruned (or, with ``dry_run``, that would be) under each rule.
+
+    Rows are archived before they are deleted, so an interrupted run can leave rows in the
+    archive that are still in the table; the next run appends them again.
+    """
+    config = config or get_config()
+    today = today or timezone.now().date()
+    archive_dir = Path(config['ARCHIVE_DIR']) if config['ARCHIVE_DIR'] else None
+    rules = retention_rules(config)
+    pruned = {}
+
+    for prefix, days in rules:
+        logs = expired(prefix, days, rules, today)
+        if dry_run:
+            pruned[prefix] = logs.count()
+            continue
+
+        pruned[prefix] = 0
+        while True:
+            if archive_dir is None:
+                rows = list(logs.order_by('day', 'id').values('id')[:config['BATCH_SIZE']])
+            else:
+                rows = list(logs.order_by('day', 'id').values(*FIELDS)[:config['BATCH_SIZE']])
+            if not rows:
+                break
+
+            if archive_dir is not None:
+                archive(rows, archive_dir)
+            RequestLog.objects.filter(id__in=[row['id'] for row in rows]).delete()
+
+            pruned[prefix] += len(rows)
+            if len(rows) < config['BATCH_SIZE']:
+                break
+            if config['PAUSE']:
+                time.sleep(config['PAUSE'])
+
+    return pruned
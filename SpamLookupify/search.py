@@ -0,0 +1,115 @@
+from django.db.models import Exists, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+from .models import User, Contact, SpamReputation
+from .search_index import matching_users, matching_contacts
+from . import reputation, email_visibility
+
+# The columns a registered user search result is built from.
+USER_RESULT_FIELDS = ('id', 'name', 'phone_number', 'email')
+
+def reputation_annotations():
+    reputations = SpamReputation.objects.filter(phone_number=OuterRef('normalized_phone_number'))
+    return {
+        'spam_count': Coalesce(Subquery(reputations.values('total_reports')[:1]), 0),
+        'decayed_score': Coalesce(Subquery(reputations.values('decayed_score')[:1]), 0.0),
+        'score_as_of': Coalesce(Subquery(reputations.values('score_as_of')[:1]), 0.0),
+    }
+
+def name_search_stages(query):
+    """
+    The querysets read one after another by a name search, for paginate_stages: users whose
+    name starts with ``query``, contacts whose name does, then users and contacts whose name
+    contains it further in.
+    """
+    all_users = matching_users(query)
+    prefix_contacts = matching_contacts(query, prefix=True)
+    substring_contacts = matching_contacts(query, prefix=False)
+
+    def user_stage(users):
+        return users.annotate(
+            **reputation_annotations(),
+        ).values('id', 'name', 'phone_number', 'email', 'spam_count', 'decayed_score', 'score_as_of').order_by('id')
+
+    # A phone number is listed once: registered users win, then prefix matches, then the lowest id.
+    def contact_stage(contacts, better_contacts=None):
+        contacts = contacts.exclude(normalized_phone_number__in=all_users.values('normalized_phone_number'))
+        if better_contacts is not None:
+            contacts = contacts.exclude(normalized_phone_number__in=better_contacts.values('normalized_phone_number'))
+
+        return contacts.exclude(
+            Exists(contacts.filter(normalized_phone_number=OuterRef('normalized_phone_number'), id__lt=OuterRef('id')))
+        ).annotate(
+            **reputation_annotations(),
+        ).values('id', 'name', 'phone_number', 'spam_count', 'decayed_score', 'score_as_of').order_by('id')
+
+    return [
+        user_stage(matching_users(query, prefix=True)),
+        contact_stage(prefix_contacts),
+        user_stage(matching_users(query, prefix=False)),
+        contact_stage(substring_contacts, prefix_contacts),
+    ]
+
+def name_search_results(rows, requesting_phone_number, now):
+    """
+    Rows from name_search_stages as response items. A registered user's email is shown only to
+    the people in their contacts, resolved for the whole page with one query.
+    """
+    # Contact rows have no email; their ids are contact ids, not user ids.
+    visible = email_visibility.holders_among(requesting_phone_number, [row['id'] for row in rows if row.get('email')])
+    results = []
+
+    for row in rows:
+        result = {
+            "name": row['name'],
+            "phone_number": row['phone_number'],
+            "spam_count": row['spam_count'],
+            "spam_score": round(reputation.current_score(row['decayed_score'], row['score_as_of'], now), 2),
+        }
+        if row.get('email') and row['id'] in visible:
+            result["email"] = row['email']
+        results.append(result)
+
+    return results
+
+def registered_user_query(phone_number, position):
+    """
+    The lookup of the registered user a phone number search answers with, or None when it need
+    not run: cursors are only handed out while listing contacts, so a follow-up page never
+    shows a registered user.
+    """
+    if position is not None:
+        return None
+    return User.objects.filter(normalized_phone_number=phone_number).only(*USER_RESULT_FIELDS)
+
+def registered_user_result(user, phone_number, requesting_user_id, spam_count, decayed_score, score_as_of):
+    # Users without an email have nothing to hide, so the contacts are not consulted.
+    email_visible = bool(user.email) and requesting_user_id in email_visibility.holders_among(phone_number, [requesting_user_id])
+    return phone_number_result(user.name, user.phone_number, spam_count, decayed_score, score_as_of, user.email if email_visible else None)
+
+def phone_number_contacts(phone_number):
+    return Contact.objects.filter(normalized_phone_number=phone_number).values(
+        'id', 'name', 'phone_number', 'owner_id', 'owner__email',
+    ).order_by('id')
+
+def phone_number_contact_results(rows, requesting_phone_number, spam_count, decayed_score, score_as_of):
+    visible = email_visibility.holders_among(requesting_phone_number, [row['owner_id'] for row in rows if row['owner__email']])
+    return [
+        phone_number_result(
+            row['name'], row['phone_number'], spam_count, decayed_score, score_as_of,
+            row['owner__email'] if row['owner_id'] in visible else None,
+        )
+        for row in rows
+    ]
+
+def phone_number_result(name, phone_number, spam_count, decayed_score, score_as_of, email=None):
+    result = {
+        "name": name,
+        "phone_number": phone_number,
+        "spam_count": spam_count,
+        "spam_score": round(reputation.current_score(decayed_score, score_as_of), 2),
+    }
+
+    if email:
+        result["email"] = email
+
+    return result
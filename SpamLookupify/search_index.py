@@ -0,0 +1,116 @@
+from django.conf import settings
+from django.db import connections, router
+from django.db.models import Exists, OuterRef, Q
+from .models import User, Contact, NameSearchTerm
+
+# Every name is indexed by its suffixes, truncated to TERM_LENGTH characters. A substring
+# search then becomes an index range scan over ``term`` and the suffix starting at offset
+# 0 tells a prefix match apart from a match further inside the name.
+TERM_LENGTH = 16
+BATCH_SIZE = 500
+
+def get_max_candidates():
+    return getattr(settings, 'SEARCH_MAX_CANDIDATES', 1000)
+
+def normalize_name(name):
+    return ' '.join((name or '').casefold().split())
+
+def name_terms(name):
+    normalized = normalize_name(name)
+    return [
+        (normalized[offset:offset + TERM_LENGTH], offset)
+        for offset in range(len(normalized))
+        if normalized[offset] != ' '
+    ]
+
+def build_terms(field, objects):
+    return [
+        NameSearchTerm(term=term, offset=offset, **{field: obj.pk})
+        for obj in objects
+        for term, offset in name_terms(obj.name)
+    ]
+
+def reindex(field, objects):
+    objects = list(objects)
+    for start in range(0, len(objects), BATCH_SIZE):
+        batch = objects[start:start + BATCH_SIZE]
+        NameSearchTerm.objects.filter(**{f'{field}__in': [obj.pk for obj in batch]}).delete()
+        NameSearchTerm.objects.bulk_create(build_terms(field, batch), batch_size=BATCH_SIZE)
+
+def index_users(users):
+    reindex('user_id', users)
+
+def index_contacts(contacts):
+    reindex('contact_id', contacts)
+
+def matching_terms(query, prefix=None):
+    """
+    Index rows whose term starts with ``query``, at the start of the name for ``prefix=True``
+    and further in for ``prefix=False``. SQLite compares ``term`` with its default
+    BINARY collation, so a plain range scan is exact there. Elsewhere the comparison follows
+    the column's collation and ``startswith`` is used instead; on PostgreSQL the index is
+    built with varchar_pattern_ops so that LIKE 'term%' can use it under any collation.
+    """
+    term = normalize_name(query)[:TERM_LENGTH]
+    if not term:
+        return NameSearchTerm.objects.none()
+
+    if connections[router.db_for_read(NameSearchTerm)].vendor == 'sqlite':
+        terms = NameSearchTerm.objects.filter(term__gte=term, term__lt=term + '\U0010ffff')
+    else:
+        terms = NameSearchTerm.objects.filter(term__startswith=term)
+    if prefix:
+        terms = terms.filter(offset=0)
+    elif prefix is False:
+        terms = terms.filter(offset__gt=0)
+    return terms
+
+def candidates(model, field, query, prefix):
+    """
+    Ids of the first SEARCH_MAX_CANDIDATES matching index rows in index order. The scan stops
+    there instead of reading every match, so a broad query keeps the names closest to it
+    alphabetically ("john" before "johnson") and leaves the rest out.
+    """
+    ids = matching_terms(query, prefix=prefix).filter(**{f'{field}__isnull': False}).order_by(
+        'term', 'offset', field,
+    ).values(field)[:get_max_candidates()]
+    if not connections[router.db_for_read(model)].features.allow_sliced_subqueries_with_in:
+        ids = list(ids)
+    return ids
+
+def matching(model, field, query, prefix=None):
+    """
+    Objects of ``model`` whose name contains ``query``.
+
+    ``prefix=True`` keeps names starting with the query, ``prefix=False`` keeps names
+    containing it anywhere but the start and ``None`` keeps both.
+
+    Only the first SEARCH_MAX_CANDIDATES matching prefix and infix index rows are considered,
+    so a page costs the same however common the query is; see candidates().
+    """
+    if prefix is None:
+        # Separate capped scans, so that each one can use its partial index.
+        queryset = model.objects.filter(
+            Q(pk__in=candidates(model, field, query, prefix=True))
+            | Q(pk__in=candidates(model, field, query, prefix=False))
+        )
+    else:
+        queryset = model.objects.filter(pk__in=candidates(model, field, query, prefix=prefix))
+
+    if prefix is False:
+        queryset = queryset.exclude(
+            Exists(matching_terms(query, prefix=True).filter(**{field: OuterRef('pk')}))
+        )
+
+    if len(normalize_name(query)) > TERM_LENGTH:
+        queryset = queryset.filter(name__icontains=query)
+        if prefix:
+            queryset = queryset.filter(name__istartswith=query)
+
+    return queryset
+
+def matching_users(query, prefix=None):
+    return matching(User, 'user_id', query, prefix=prefix)
+
+def matching_contacts(query, prefix=None):
+    return matching(Contact, 'contact_id', query, prefix=prefix)
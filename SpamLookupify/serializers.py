@@ -1,15 +1,30 @@
 from rest_framework import serializers
 from django.contrib.auth.hashers import make_password
 from .models import User, Contact, SpamReport
+from .phone import normalize_phone_number
 import re
 from rest_framework.exceptions import ValidationError
 
+def validate_normalizable_phone_number(value):
+    if normalize_phone_number(value) is None:
+        raise ValidationError("Enter a valid phone number.")
+    return value
+
 class UserSerializer(serializers.ModelSerializer):
     class Meta:
         model = User
         fields = ['id', 'name', 'username', 'phone_number', 'email', 'password']
         extra_kwargs = {'password': {'write_only': True}}
 
+    def validate_phone_number(self, value):
+        validate_normalizable_phone_number(value)
+        users = User.objects.filter(normalized_phone_number=normalize_phone_number(value))
+        if self.instance is not None:
+            users = users.exclude(pk=self.instance.pk)
+        if users.exists():
+            raise ValidationError("A user with this phone number already exists.")
+        return value
+
     def create(self, validated_data):
         validated_data['password'] = make_password(validated_data['password'])
         return super().create(validated_data)
@@ -19,6 +34,9 @@ class ContactSerializer(serializers.ModelSerializer):
         model = Contact
         fields = ['id', 'name', 'phone_number', 'is_spam', 'is_anonymous']
 
+    def validate_phone_number(self, value):
+        return validate_normalizable_phone_number(value)
+
 class SpamReportSerializer(serializers.ModelSerializer):
     class Meta:
         model = SpamReport
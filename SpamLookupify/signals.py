@@ -0,0 +1,28 @@
+from django.db.models.signals import post_init, post_save, post_delete
+from django.dispatch import receiver
+from .models import User, Contact, SpamReputation
+from .search_index import index_users, index_contacts
+from . import spam_cache
+
+@receiver(post_init, sender=User)
+@receiver(post_init, sender=Contact)
+def remember_indexed_name(sender, instance, **kwargs):
+    instance._indexed_name = instance.__dict__.get('name')
+
+@receiver(post_save, sender=User)
+@receiver(post_save, sender=Contact)
+def update_name_index(sender, instance, created, **kwargs):
+    if not created and instance.__dict__.get('name') == instance._indexed_name:
+        return
+
+    if sender is User:
+        index_users([instance])
+    else:
+        index_contacts([instance])
+
+    instance._indexed_name = instance.__dict__.get('name')
+
+@receiver(post_save, sender=SpamReputation)
+@receiver(post_delete, sender=SpamReputation)
+def invalidate_spam_score(sender, instance, **kwargs):
+    spam_cache.invalidate([instance.phone_number])
@@ -0,0 +1,62 @@
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+from .models import SpamReputation
+from . import metrics
+
+DEFAULTS = {
+    'CACHE': 'spam_scores',
+    'TIMEOUT': 300,
+    # Entries are (total reports, decayed score, score as of); the prefix changed with the layout.
+    'KEY_PREFIX': 'spam-reputation-v2',
+}
+
+def get_config():
+    return {**DEFAULTS, **getattr(settings, 'SPAM_SCORE_CACHE', {})}
+
+def cache_key(config, phone_number):
+    return f"{config['KEY_PREFIX']}:{phone_number}"
+
+def get_reputations(phone_numbers):
+    """
+    Read-through lookup of (total reports, decayed score, score as of) per number. Numbers missing from the
+    cache are loaded from SpamReputation with a single query and cached, including numbers
+    that were never reported. Callers still read the users and contacts behind a number
+    from the database.
+    """
+    config = get_config()
+    cache = caches[config['CACHE']]
+    keys = {cache_key(config, phone_number): phone_number for phone_number in phone_numbers}
+
+    counts = {keys[key]: count for key, count in cache.get_many(list(keys)).items()}
+    missing = [phone_number for phone_number in keys.values() if phone_number not in counts]
+    metrics.SPAM_CACHE_LOOKUPS.inc(len(counts), result='hit')
+    metrics.SPAM_CACHE_LOOKUPS.inc(len(missing), result='miss')
+
+    if missing:
+        loaded = dict.fromkeys(missing, (0, 0.0, 0.0))
+        loaded.update(
+            (phone_number, (total_reports, decayed_score, score_as_of))
+            for phone_number, total_reports, decayed_score, score_as_of in SpamReputation.objects.filter(
+                phone_number__in=missing
+            ).values_list('phone_number', 'total_reports', 'decayed_score', 'score_as_of')
+        )
+        cache.set_many({cache_key(config, phone_number): count for phone_number, count in loaded.items()}, config['TIMEOUT'])
+        counts.update(loaded)
+
+    return counts
+
+def get_reputation(phone_number):
+    return get_reputations([phone_number])[phone_number]
+
+def invalidate(phone_numbers):
+    config = get_config()
+    keys = [cache_key(config, phone_number) for phone_number in phone_numbers]
+    cache = caches[config['CACHE']]
+
+    cache.delete_many(keys)
+    # Also drop anything a concurrent reader cached from the pre-commit state.
+    transaction.on_commit(lambda: cache.delete_many(keys))
+
+def invalidate_all():
+    caches[get_config()['CACHE']].clear()
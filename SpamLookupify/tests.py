@@ -1,8 +1,40 @@
-from django.test import TestCase
+import csv
+import gzip
+import json
+import tempfile
+import threading
+import time
+from pathlib import Path
+from types import SimpleNamespace
+import uuid
+from datetime import date, datetime, timedelta, timezone as dt_timezone
+from decimal import Decimal
+from unittest import skipUnless
+from asgiref.sync import sync_to_async
+from io import StringIO
+from django.db import connection, connections
+from django.core.cache import caches
+from django.core.exceptions import ImproperlyConfigured
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import AnonymousUser
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
 from rest_framework import status
+from rest_framework.renderers import JSONRenderer
 from rest_framework.test import APIClient
-from SpamLookupify.models import User, Contact, SpamReport
+from SpamLookupify.models import User, Contact, SpamReport, SpamReporters, SpamReputation, RequestLog
+from SpamLookupify.request_log import RequestLogWriter
+from SpamLookupify.renderers import FastJSONRenderer
+from SpamLookupify.serializers import ContactSerializer
+from SpamLookupify.middleware import QueryRecorder
+from SpamLookupify.authentication import issue_token
+from SpamLookupify.ratelimit import SlidingWindowThrottle, LoginThrottle
+from SpamLookupify.phone import normalize_phone_number
+from SpamLookupify import benchmarks, metrics, reputation, hashers, renderers
+from django.core.management import call_command, CommandError
 
 class UserRegistrationTestCase(TestCase):
     def setUp(self):
@@ -27,6 +59,18 @@ class UserRegistrationTestCase(TestCase):
         })
         self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
 
+    def test_duplicate_canonical_phone_number(self):
+        User.objects.create_user(name='User1', username='user1', password='password123', phone_number='+1234567890')
+        response = self.client.post(reverse('register'), {
+            'name': 'User2',
+            'username': 'user2',
+            'password': 'password123',
+            'phone_number': '1234567890'
+        })
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('phone_number', response.data)
+        self.assertEqual(User.objects.filter(normalized_phone_number='+1234567890').count(), 1)
+
 class UserLoginTestCase(TestCase):
     def setUp(self):
         self.client = APIClient()
@@ -47,6 +91,164 @@ class UserLoginTestCase(TestCase):
         response = self.client.get(reverse('contact-list-create'))
         self.assertEqual(response.status_code, status.HTTP_200_OK)
 
+FAST_SCRYPT = {'SCRYPT_WORK_FACTOR': 2 ** 10, 'SCRYPT_BLOCK_SIZE': 8, 'SCRYPT_PARALLELISM': 1}
+
+@override_settings(PASSWORD_HASHERS=['SpamLookupify.hashers.TunedScryptPasswordHasher', 'django.contrib.auth.hashers.MD5PasswordHasher'])
+class PasswordHashingTestCase(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.addCleanup(hashers.reset)
+
+    def register_and_login(self):
+        self.client.post(reverse('register'), {'name': 'User1', 'username': 'user1', 'password': 'password123', 'phone_number': '+1234567890'})
+        return self.client.post(reverse('login'), {'username': 'user1', 'password': 'password123', 'auth': 'token'})
+
+    def hold_the_only_slot(self):
+        started, release = threading.Event(), threading.Event()
+        blocker = threading.Thread(target=hashers.admit, args=(lambda: started.set() or release.wait(),))
+        blocker.start()
+        self.addCleanup(blocker.join)
+        self.addCleanup(release.set)
+        started.wait()
+
+    @override_settings(PASSWORD_HASHING={**FAST_SCRYPT, 'LIMIT_CONCURRENCY': True, 'MAX_CONCURRENT': 1})
+    def test_concurrent_hashes_are_limited(self):
+        running, peak = 0, 0
+        lock = threading.Lock()
+        def hash_password():
+            nonlocal running, peak
+            with lock:
+                running += 1
+                peak = max(peak, running)
+            time.sleep(0.01)
+            with lock:
+                running -= 1
+
+        threads = [threading.Thread(target=hashers.admit, args=(hash_password,)) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(peak, 1)
+        self.assertEqual(self.register_and_login().status_code, status.HTTP_200_OK)
+        self.assertTrue(User.objects.get(username='user1').password.startswith('scrypt$1024$'))
+
+    @override_settings(PASSWORD_HASHING={**FAST_SCRYPT, 'LIMIT_CONCURRENCY': True, 'MAX_CONCURRENT': 1, 'MAX_PENDING': 0, 'QUEUE_TIMEOUT': 0.01})
+    def test_full_queue_refuses_logins(self):
+        self.register_and_login()
+        self.hold_the_only_slot()
+
+        response = self.client.post(reverse('login'), {'username': 'user1', 'password': 'password123', 'auth': 'token'})
+        self.assertEqual(response.status_code, status.HTTP_503_SERVICE_UNAVAILABLE)
+
+    @override_settings(PASSWORD_HASHING={**FAST_SCRYPT, 'LIMIT_CONCURRENCY': True, 'MAX_CONCURRENT': 1, 'MAX_PENDING': 0, 'QUEUE_TIMEOUT': 0.01})
+    def test_full_queue_is_a_503_outside_the_api(self):
+        User.objects.create_superuser(name='Admin', username='admin', password='password123', phone_number='+1234567890')
+        self.hold_the_only_slot()
+
+        response = self.client.post(reverse('admin:login'), {'username': 'admin', 'password': 'password123'})
+        self.assertEqual(response.status_code, status.HTTP_503_SERVICE_UNAVAILABLE)
+
+    @override_settings(PASSWORD_HASHING=FAST_SCRYPT)
+    def test_legacy_hashes_are_upgraded_on_login(self):
+        user = User.objects.create(name='User1', username='user1', phone_number='+1234567890')
+        User.objects.filter(id=user.id).update(password=make_password('password123', hasher='md5'))
+
+        response = self.client.post(reverse('login'), {'username': 'user1', 'password': 'password123', 'auth': 'token'})
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertTrue(User.objects.get(id=user.id).password.startswith('scrypt$'))
+
+@override_settings(RATELIMIT={'ENABLED': True, 'CACHE': 'throttle'})
+class RateLimitTestCase(TestCase):
+    class MinuteThrottle(SlidingWindowThrottle):
+        rate = '10/minute'
+
+    class DayThrottle(SlidingWindowThrottle):
+        rate = '100/minute'
+        day_rate = '3/day'
+
+    def setUp(self):
+        caches['throttle'].clear()
+        self.request = SimpleNamespace(user=AnonymousUser(), META={'REMOTE_ADDR': '10.0.0.1'})
+
+    def allowed(self, throttle, now, requests):
+        throttle.timer = lambda: now
+        return [throttle.allow_request(self.request, None) for _ in range(requests)]
+
+    def test_previous_window_is_weighted_by_its_overlap(self):
+        throttle = self.MinuteThrottle()
+        self.assertEqual(self.allowed(throttle, 600, 11), [True] * 10 + [False])
+        self.assertAlmostEqual(throttle.wait(), 66)
+
+        # Half way through the next window, half of the previous 10 requests still count.
+        self.assertEqual(self.allowed(throttle, 690, 6), [True] * 5 + [False])
+
+    def test_every_window_is_enforced(self):
+        throttle = self.DayThrottle()
+        self.assertEqual(self.allowed(throttle, 86400, 4), [True] * 3 + [False])
+        self.assertAlmostEqual(throttle.wait(), 115200)
+
+    def test_retry_after_wait_is_allowed(self):
+        throttle = LoginThrottle()
+        self.assertEqual(self.allowed(throttle, 600, 6), [True] * 5 + [False])
+
+        # Rejected retries are not counted, so they do not push the wait back.
+        retry_at = 600 + throttle.wait()
+        self.assertEqual(self.allowed(throttle, retry_at - 1, 2), [False, False])
+        self.assertEqual(self.allowed(throttle, retry_at, 1), [True])
+
+    def test_login_endpoint_is_throttled(self):
+        User.objects.create_user(name='User1', username='user1', password='password123', phone_number='+1234567890')
+        client = APIClient()
+
+        for _ in range(5):
+            response = client.post(reverse('login'), {'username': 'user1', 'password': 'password123', 'auth': 'token'})
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+        response = client.post(reverse('login'), {'username': 'user1', 'password': 'password123', 'auth': 'token'})
+        self.assertEqual(response.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+        self.assertIn('Retry-After', response)
+
+class TokenAuthenticationTestCase(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.user = User.objects.create_user(name='User1', username='user1', password='password123', phone_number='+1234567890')
+        Contact.objects.create(owner=self.user, name='Friend', phone_number='+1122334455')
+
+    def login(self):
+        response = self.client.post(reverse('login'), {'username': 'user1', 'password': 'password123', 'auth': 'token'})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertNotIn('sessionid', response.cookies)
+        return response.data['token']
+
+    def test_token_requests_do_not_query_sessions_or_users(self):
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {self.login()}')
+
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse('contact-list-create'))
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(response.data), 1)
+        tables = ' '.join(query['sql'] for query in queries)
+        self.assertNotIn('django_session', tables)
+        # The contact list reads its version from the user table, but never the user itself.
+        self.assertNotIn('"SpamLookupify_user"."password"', tables)
+        self.assertEqual(RequestLog.objects.last().user, self.user)
+
+    def test_tampered_and_expired_tokens_are_rejected(self):
+        token = self.login()
+
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {token[:-1]}x')
+        self.assertEqual(self.client.get(reverse('contact-list-create')).status_code, status.HTTP_403_FORBIDDEN)
+
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {token}')
+        with override_settings(AUTH_TOKEN={'MAX_AGE': -1}):
+            response = self.client.get(reverse('contact-list-create'))
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+        self.assertIn('expired', response.data['detail'])
+
 class ContactManagementTestCase(TestCase):
     def setUp(self):
         self.client = APIClient()
@@ -69,6 +271,164 @@ class ContactManagementTestCase(TestCase):
         self.assertEqual(response.status_code, status.HTTP_200_OK)
         self.assertEqual(len(response.data), 1)
 
+    def test_contact_list_matches_the_serializer(self):
+        for index in range(3):
+            Contact.objects.create(owner=self.user, name=f'Jane \u2028 Dœ {index}', phone_number=f'+098765432{index}', is_spam=bool(index % 2))
+
+        response = self.client.get(reverse('contact-list-create'))
+
+        expected = ContactSerializer(Contact.objects.filter(owner=self.user), many=True).data
+        self.assertEqual(response.content, JSONRenderer().render(expected))
+
+class FastJSONRendererTestCase(TestCase):
+    data = {
+        'text': 'Zoë \u2028 \u2029 "quoted"',
+        'numbers': [1, -2, 0.25, 2 ** 62, True, None],
+        'nested': {1: Decimal('1.50'), 'id': uuid.UUID(int=1)},
+        'when': datetime(2026, 3, 1, 12, 30, 15, 123456, tzinfo=dt_timezone.utc),
+        'day': date(2026, 3, 1),
+    }
+
+    def test_output_matches_json_renderer(self):
+        self.assertEqual(FastJSONRenderer().render(self.data), JSONRenderer().render(self.data))
+
+    def test_integers_beyond_64_bits_fall_back(self):
+        self.assertEqual(renderers.dumps({'big': 10 ** 20}), b'{"big":100000000000000000000}')
+
+    def test_falls_back_to_the_standard_library(self):
+        original, renderers.orjson = renderers.orjson, None
+        try:
+            self.assertEqual(renderers.dumps(self.data), JSONRenderer().render(self.data))
+        finally:
+            renderers.orjson = original
+
+    def test_indented_output_is_left_to_json_renderer(self):
+        rendered = FastJSONRenderer().render(self.data, 'application/json; indent=2')
+        self.assertEqual(rendered, JSONRenderer().render(self.data, 'application/json; indent=2'))
+
+class ConditionalContactsTestCase(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.user = User.objects.create_user(name='User1', username='user1', password='password123', phone_number='+1234567890')
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {issue_token(self.user)}')
+        self.contact = Contact.objects.create(owner=self.user, name='Jane Doe', phone_number='+1987654321')
+
+    def etag(self, url=None):
+        response = self.client.get(url or reverse('contact-list-create'))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertIn('no-cache', response['Cache-Control'])
+        return response['ETag']
+
+    def test_unchanged_list_is_not_modified(self):
+        etag = self.etag()
+
+        # The version lookup and the request log; no contact is read.
+        with self.assertNumQueries(2):
+            response = self.client.get(reverse('contact-list-create'), HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertEqual(response['ETag'], etag)
+        self.assertEqual(response.content, b'')
+
+        last_modified = self.client.get(reverse('contact-list-create'))['Last-Modified']
+        response = self.client.get(reverse('contact-list-create'), HTTP_IF_MODIFIED_SINCE=last_modified)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+    def test_every_write_changes_the_etag(self):
+        detail = reverse('contact-detail', args=[self.contact.id])
+        writes = [
+            lambda: self.client.post(reverse('contact-list-create'), {'name': 'New', 'phone_number': '+1555000111'}),
+            lambda: self.client.put(detail, {'name': 'Jane Roe'}),
+            lambda: self.client.post(reverse('contact-bulk'), [{'name': 'Bulk', 'phone_number': '+1555000222'}], format='json'),
+            lambda: self.client.post(reverse('report-spam'), {'phone_number': '+1555000333'}),
+            lambda: self.client.delete(detail),
+        ]
+
+        etags = [self.etag()]
+        for write in writes:
+            self.assertLess(write().status_code, 300)
+            etags.append(self.etag())
+
+        self.assertEqual(len(set(etags)), len(etags))
+
+    def test_spam_reports_change_the_etag_of_every_holder(self):
+        other = User.objects.create(name='Other', username='other', phone_number='+5550000000')
+        etag = self.etag()
+
+        reporter = APIClient()
+        reporter.force_authenticate(other)
+        reporter.post(reverse('report-spam'), {'phone_number': '+1987654321'})
+
+        self.assertNotEqual(self.etag(), etag)
+
+    def test_contact_detail(self):
+        detail = reverse('contact-detail', args=[self.contact.id])
+        etag = self.etag(detail)
+
+        self.assertEqual(self.client.get(detail, HTTP_IF_NONE_MATCH=etag).status_code, status.HTTP_304_NOT_MODIFIED)
+        self.client.put(detail, {'name': 'Jane Roe'})
+        self.assertEqual(self.client.get(detail, HTTP_IF_NONE_MATCH=etag).status_code, status.HTTP_200_OK)
+
+class ContactBulkImportTestCase(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.user = User.objects.create_user(name='User1', username='user1', password='password123', phone_number='+1234567890')
+        self.client.login(username='user1', password='password123')
+        self.existing = Contact.objects.create(owner=self.user, name='Jane Doe', phone_number='+0987654321')
+
+    def test_import_skips_existing_numbers(self):
+        response = self.client.post(reverse('contact-bulk'), [
+            {'name': 'Jane Again', 'phone_number': '+0987654321'},
+            {'name': 'Alice Anderson', 'phone_number': '+1122334455'},
+            {'name': 'Bob Barker', 'phone_number': '+2233445566'},
+        ], format='json')
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['created'], 2)
+        self.assertEqual(response.data['unchanged'], 1)
+        self.assertEqual(Contact.objects.get(id=self.existing.id).name, 'Jane Doe')
+        self.assertEqual(self.client.get(reverse('search'), {'query': 'barker'}).data[0]['name'], 'Bob Barker')
+
+    def test_import_accepts_ndjson(self):
+        body = '{"name": "Alice Anderson", "phone_number": "+1122334455"}\n\n{"name": "Bob Barker", "phone_number": "+2233445566"}\n'
+        response = self.client.post(reverse('contact-bulk'), body, content_type='application/x-ndjson')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(Contact.objects.filter(owner=self.user).count(), 3)
+
+    def test_sync_applies_adds_updates_and_deletes(self):
+        Contact.objects.create(owner=self.user, name='Old Friend', phone_number='+5566778899')
+        response = self.client.post(reverse('contact-bulk') + '?mode=sync', [
+            {'name': 'Jane Smith', 'phone_number': '+0987654321'},
+            {'name': 'Alice Anderson', 'phone_number': '+1122334455'},
+        ], format='json')
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual((response.data['created'], response.data['updated'], response.data['deleted']), (1, 1, 1))
+        self.assertEqual(
+            sorted(Contact.objects.filter(owner=self.user).values_list('name', flat=True)),
+            ['Alice Anderson', 'Jane Smith'],
+        )
+        self.assertEqual(self.client.get(reverse('search'), {'query': 'friend'}).data, [])
+
+    def test_sync_keeps_reported_numbers(self):
+        self.client.post(reverse('report-spam'), {'phone_number': '+1555000111'})
+        response = self.client.post(reverse('contact-bulk') + '?mode=sync', [
+            {'name': 'Jane Doe', 'phone_number': '+0987654321'},
+            {'name': 'Alice Anderson', 'phone_number': '+1122334455'},
+        ], format='json')
+
+        self.assertEqual((response.data['created'], response.data['deleted']), (1, 0))
+        response = self.client.get(reverse('search'), {'phone_number': '+1555000111'})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data[0]['spam_count'], 1)
+
+    def test_invalid_rows_reject_the_upload(self):
+        response = self.client.post(reverse('contact-bulk'), [
+            {'name': 'Alice Anderson', 'phone_number': '+1122334455'},
+            {'name': 'Broken', 'phone_number': 'nope'},
+        ], format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(Contact.objects.filter(owner=self.user).count(), 1)
+
 class SpamReportingTestCase(TestCase):
     def setUp(self):
         self.client = APIClient()
@@ -81,8 +441,197 @@ class SpamReportingTestCase(TestCase):
             'phone_number': '+1122334455'
         })
         self.assertEqual(response.status_code, status.HTTP_200_OK)
-        spam_report = SpamReport.objects.get(phone_number='+1122334455')
-        self.assertEqual(spam_report.spam_count, 1)
+        self.assertEqual(SpamReputation.objects.get(phone_number='+1122334455').total_reports, 1)
+        self.assertFalse(SpamReport.objects.exists())
+
+    def test_repeated_reports_accumulate(self):
+        other = User.objects.create(name='Other', username='other', phone_number='+5550000000')
+        Contact.objects.create(owner=other, name='Caller', phone_number='+1122334455')
+        for _ in range(3):
+            self.client.post(reverse('report-spam'), {'phone_number': '+1122334455'})
+
+        self.assertEqual(SpamReputation.objects.get(phone_number='+1122334455').total_reports, 3)
+        self.assertEqual(SpamReporters.objects.get(user=self.user, phone_number='+1122334455').report_count, 3)
+        self.assertTrue(Contact.objects.get(owner=other).is_spam)
+        self.assertFalse(Contact.objects.filter(owner=self.user).exists())
+
+    def test_unknown_numbers_fit_the_anonymous_contact(self):
+        self.client.post(reverse('report-spam'), {'phone_number': '123456789012345'})
+        contact = Contact.objects.get(owner=self.user, is_anonymous=True)
+        self.assertEqual(contact.phone_number, '+123456789012345')
+        self.assertLessEqual(len(contact.phone_number), Contact._meta.get_field('phone_number').max_length)
+
+    def test_cannot_report_own_number(self):
+        response = self.client.post(reverse('report-spam'), {'phone_number': '+1234567890'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertFalse(SpamReputation.objects.exists())
+
+class SpamReputationTestCase(TestCase):
+    def setUp(self):
+        self.clients = []
+        for index in range(2):
+            User.objects.create_user(name=f'User{index}', username=f'user{index}', password='password123', phone_number=f'+155500000{index}')
+            client = APIClient()
+            client.login(username=f'user{index}', password='password123')
+            self.clients.append(client)
+
+    def report(self, client, phone_number='+1122334455'):
+        response = client.post(reverse('report-spam'), {'phone_number': phone_number})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_reports_update_the_reputation_incrementally(self):
+        self.report(self.clients[0])
+        self.report(self.clients[0])
+        self.report(self.clients[1], '1122334455')
+
+        row = SpamReputation.objects.get(phone_number='+1122334455')
+        self.assertEqual((row.distinct_reporters, row.total_reports), (2, 3))
+
+        response = self.clients[0].get(reverse('search'), {'phone_number': '+1122334455'})
+        self.assertEqual(response.data[0]['spam_count'], 3)
+        self.assertAlmostEqual(response.data[0]['spam_score'], 3, places=1)
+
+    def test_rebuild_matches_incremental_updates(self):
+        self.report(self.clients[0])
+        self.report(self.clients[1])
+        self.report(self.clients[1], '+1999888777')
+        before = list(SpamReputation.objects.order_by('phone_number').values_list('phone_number', 'distinct_reporters', 'total_reports'))
+
+        call_command('rebuild_spam_reputation', stdout=StringIO())
+
+        after = list(SpamReputation.objects.order_by('phone_number').values_list('phone_number', 'distinct_reporters', 'total_reports'))
+        self.assertEqual(after, before)
+
+    def test_score_halves_every_half_life(self):
+        reported_at = timezone.now()
+        reputation.record({'+1122334455': 4}, {'+1122334455'}, reported_at)
+        row = SpamReputation.objects.get()
+
+        self.assertAlmostEqual(reputation.current_score(row.decayed_score, row.score_as_of, reported_at), 4)
+        self.assertAlmostEqual(reputation.current_score(row.decayed_score, row.score_as_of, reported_at + timedelta(days=30)), 2)
+
+    def test_new_reports_add_to_the_decayed_score(self):
+        reported_at = timezone.now()
+        reputation.record({'+1122334455': 4}, {'+1122334455'}, reported_at)
+        reputation.record({'+1122334455': 1}, set(), reported_at + timedelta(days=30))
+        row = SpamReputation.objects.get()
+
+        self.assertEqual(row.score_as_of, (reported_at + timedelta(days=30)).timestamp())
+        self.assertAlmostEqual(row.decayed_score, 3)
+
+    @override_settings(SPAM_REPUTATION_HALF_LIFE_DAYS=1)
+    def test_short_half_lives_do_not_overflow_far_from_the_first_report(self):
+        reported_at = timezone.now()
+        reputation.record({'+1122334455': 2}, {'+1122334455'}, reported_at)
+        reputation.record({'+1122334455': 1}, set(), reported_at.replace(year=reported_at.year + 50))
+        row = SpamReputation.objects.get()
+
+        self.assertAlmostEqual(row.decayed_score, 1)
+        self.assertEqual(reputation.current_score(row.decayed_score, row.score_as_of, reported_at.replace(year=reported_at.year + 80)), 0)
+
+    def test_half_life_must_be_positive(self):
+        for days in (0, -1, '30'):
+            with self.settings(SPAM_REPUTATION_HALF_LIFE_DAYS=days), self.assertRaises(ImproperlyConfigured):
+                reputation.half_life()
+
+class PhoneNumberNormalizationTestCase(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.user = User.objects.create_user(name='User1', username='user1', password='password123', phone_number='+1234567890')
+        self.client.login(username='user1', password='password123')
+
+    def test_variants_share_one_canonical_form(self):
+        for phone_number in ['+1234567890', '1234567890', '001234567890', '+1 (234) 567-890']:
+            self.assertEqual(normalize_phone_number(phone_number), '+1234567890')
+        self.assertEqual(normalize_phone_number('5550001111'), '+15550001111')
+        self.assertEqual(normalize_phone_number('05550001111', default_country_code='44'), '+445550001111')
+        self.assertIsNone(normalize_phone_number('12ab'))
+
+    def test_reports_for_variants_share_one_counter(self):
+        for phone_number in ['+1122334455', '1122334455', '001122334455']:
+            self.client.post(reverse('report-spam'), {'phone_number': phone_number})
+        self.assertEqual(list(SpamReputation.objects.values_list('phone_number', 'total_reports')), [('+1122334455', 3)])
+
+        response = self.client.post(reverse('report-spam'), {'phone_number': '001234567890'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_lookup_matches_any_spelling(self):
+        Contact.objects.create(owner=self.user, name='Alice Anderson', phone_number='1122334455')
+        response = self.client.get(reverse('search'), {'phone_number': '+1122334455'})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data[0]['name'], 'Alice Anderson')
+
+    def test_backfill_merges_variant_counters(self):
+        SpamReport.objects.create(phone_number='1122334455', spam_count=2)
+        SpamReport.objects.create(phone_number='001122334455', spam_count=3)
+        contact = Contact.objects.create(owner=self.user, name='Alice Anderson', phone_number='1122334455')
+        Contact.objects.filter(id=contact.id).update(normalized_phone_number='')
+
+        call_command('normalize_phone_numbers', stdout=StringIO())
+
+        self.assertEqual(list(SpamReport.objects.values_list('phone_number', 'spam_count')), [('+1122334455', 5)])
+        self.assertEqual(Contact.objects.get(id=contact.id).normalized_phone_number, '+1122334455')
+
+    def test_backfill_leaves_a_taken_number_to_its_holder(self):
+        other = User.objects.create_user(name='User2', username='user2', password='password123', phone_number='1122334455')
+        # Registered before numbers were normalized.
+        later = User.objects.create_user(name='User3', username='user3', password='password123', phone_number='+1999999999')
+        User.objects.filter(id=later.id).update(phone_number='001122334455', normalized_phone_number='')
+
+        call_command('normalize_phone_numbers', stdout=StringIO(), stderr=StringIO())
+
+        self.assertEqual(User.objects.get(id=other.id).normalized_phone_number, '+1122334455')
+        self.assertEqual(User.objects.get(id=later.id).normalized_phone_number, '')
+
+class BulkSpamReportingTestCase(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.user = User.objects.create_user(name='User1', username='user1', password='password123', phone_number='+1234567890')
+        self.client.login(username='user1', password='password123')
+
+    def bulk_report(self, phone_numbers):
+        return self.client.post(reverse('report-spam-bulk'), {'phone_numbers': phone_numbers}, format='json')
+
+    def test_bulk_report_returns_per_number_results(self):
+        other = User.objects.create(name='Other', username='other', phone_number='+5550000000')
+        Contact.objects.create(owner=other, name='Caller', phone_number='+1122334455')
+
+        response = self.bulk_report(['+1122334455', 'not-a-number', '+1234567890', '+1122334455', '+2233445566'])
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['reported'], 3)
+        self.assertEqual(
+            [result['status'] for result in response.data['results']],
+            ['reported', 'invalid', 'own_number', 'reported', 'reported'],
+        )
+        self.assertEqual(SpamReputation.objects.get(phone_number='+1122334455').total_reports, 2)
+        self.assertEqual(SpamReporters.objects.get(user=self.user, phone_number='+2233445566').report_count, 1)
+        self.assertTrue(Contact.objects.get(owner=other).is_spam)
+        self.assertTrue(Contact.objects.get(owner=self.user, phone_number='+2233445566').is_anonymous)
+
+    def test_bulk_report_query_count_does_not_depend_on_batch_size(self):
+        def count_queries(phone_numbers):
+            with CaptureQueriesContext(connection) as queries:
+                self.assertEqual(self.bulk_report(phone_numbers).status_code, status.HTTP_200_OK)
+            return len(queries)
+
+        small = count_queries([f'+70000000{index:02d}' for index in range(5)])
+        large = count_queries([f'+80000000{index:02d}' for index in range(20)])
+        self.assertEqual(small, large)
+
+    def test_bulk_report_accepts_a_bare_list(self):
+        response = self.client.post(reverse('report-spam-bulk'), ['+1122334455', '+2233445566'], format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['reported'], 2)
+
+        for body in ('"+1122334455"', '42'):
+            response = self.client.post(reverse('report-spam-bulk'), body, content_type='application/json')
+            self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_bulk_report_rejects_oversized_batches(self):
+        with self.settings(BULK_REPORT_MAX_NUMBERS=2):
+            response = self.bulk_report(['+1122334455', '+2233445566', '+3344556677'])
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
 
 class SearchFunctionalityTestCase(TestCase):
     def setUp(self):
@@ -114,3 +663,703 @@ class SearchFunctionalityTestCase(TestCase):
         response = self.client.get(reverse('search'), {'phone_number': '+0000000000'})
         self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
         self.assertEqual(response.data['error'], 'No contacts found.')
+
+@override_settings(CACHES={
+    'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'},
+    'spam_scores': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'spam-scores-tests'},
+})
+class SpamScoreCacheTestCase(TestCase):
+    def setUp(self):
+        caches['spam_scores'].clear()
+        self.client = APIClient()
+        self.user = User.objects.create_user(name='User1', username='user1', password='password123', phone_number='+1234567890')
+        self.client.login(username='user1', password='password123')
+        other = User.objects.create(name='Other', username='other', phone_number='+5550000000')
+        Contact.objects.create(owner=other, name='Caller', phone_number='+1122334455')
+
+    def lookup(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse('search'), {'phone_number': '+1122334455'})
+        self.queries = [query['sql'].lower() for query in queries]
+        spam_queries = [sql for sql in self.queries if 'spamreputation' in sql]
+        return response.data[0]['spam_count'], len(spam_queries)
+
+    def test_hot_numbers_read_their_score_from_the_cache(self):
+        SpamReputation.objects.create(phone_number='+1122334455', total_reports=4, distinct_reporters=2)
+        self.assertEqual(self.lookup(), (4, 1))
+        self.assertEqual(self.lookup(), (4, 0))
+        # Only the score is cached; the contacts holding the number are read on every lookup.
+        self.assertTrue(any('spamlookupify_contact' in sql for sql in self.queries))
+
+    def test_reports_invalidate_the_cached_score(self):
+        self.assertEqual(self.lookup(), (0, 1))
+        self.client.post(reverse('report-spam'), {'phone_number': '+1122334455'})
+        self.assertEqual(self.lookup(), (1, 1))
+
+class EmailVisibilityTestCase(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.user = User.objects.create_user(name='Searcher', username='searcher', password='password123', phone_number='+1234567890')
+        self.client.login(username='searcher', password='password123')
+        self.friend = User.objects.create_user(name='Alice Friend', username='friend', password='password123', phone_number='+1555000001', email='friend@example.com')
+        self.stranger = User.objects.create_user(name='Alice Stranger', username='stranger', password='password123', phone_number='+1555000002', email='stranger@example.com')
+        Contact.objects.create(owner=self.friend, name='Searcher', phone_number='1234567890')
+
+    def emails(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse('search'), {'query': 'Alice'})
+        holder_queries = [query for query in queries if 'DISTINCT' in query['sql'] and 'owner_id' in query['sql']]
+        return {result['name']: result.get('email') for result in response.data}, len(holder_queries)
+
+    def test_page_visibility_is_resolved_with_one_query(self):
+        expected = {'Alice Friend': 'friend@example.com', 'Alice Stranger': None}
+        self.assertEqual(self.emails(), (expected, 1))
+
+    def test_contact_changes_update_visibility(self):
+        self.emails()
+        stranger = APIClient()
+        stranger.force_login(self.stranger)
+
+        response = stranger.post(reverse('contact-bulk'), [{'name': 'Searcher', 'phone_number': '+1234567890'}], format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(self.emails()[0]['Alice Stranger'], 'stranger@example.com')
+
+        contact = Contact.objects.get(owner=self.stranger)
+        stranger.put(reverse('contact-detail', args=[contact.id]), {'phone_number': '+1999999999'})
+        self.assertIsNone(self.emails()[0]['Alice Stranger'])
+
+        Contact.objects.get(owner=self.friend).delete()
+        self.assertIsNone(self.emails()[0]['Alice Friend'])
+
+        # Writes that send no signals are seen too.
+        Contact.objects.filter(owner=self.stranger).update(normalized_phone_number='+1234567890')
+        self.assertEqual(self.emails()[0]['Alice Stranger'], 'stranger@example.com')
+
+    def test_phone_number_search_resolves_visibility(self):
+        Contact.objects.create(owner=self.friend, name='Bob', phone_number='+1777000000')
+        Contact.objects.create(owner=self.stranger, name='Bob', phone_number='+1777000000')
+
+        response = self.client.get(reverse('search'), {'phone_number': '+1777000000'})
+
+        self.assertEqual([result.get('email') for result in response.data], ['friend@example.com', None])
+
+class SearchQueryCountTestCase(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.user = User.objects.create_user(name='User1', username='user1', password='password123', phone_number='+1234567890')
+        self.client.login(username='user1', password='password123')
+        self.next_number = 1000000000
+
+    def add_matches(self, count):
+        for _ in range(count):
+            self.next_number += 1
+            owner = User.objects.create(name='Alice Owner', username=f'owner{self.next_number}', phone_number=f'+{self.next_number}', email=f'owner{self.next_number}@example.com')
+            Contact.objects.create(owner=owner, name='Alice Contact', phone_number=self.user.phone_number)
+            Contact.objects.create(owner=owner, name='Alice Friend', phone_number=f'+2{self.next_number}')
+            SpamReputation.objects.create(phone_number=f'+2{self.next_number}', total_reports=3, distinct_reporters=1)
+
+    def search(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse('search'), {'query': 'Alice'})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return response, len(queries)
+
+    def test_name_search_query_count_does_not_grow_with_results(self):
+        self.add_matches(2)
+        small_response, small_queries = self.search()
+
+        self.add_matches(20)
+        large_response, large_queries = self.search()
+
+        self.assertGreater(len(large_response.data), len(small_response.data))
+        self.assertEqual(small_queries, large_queries)
+
+    def test_name_search_annotates_spam_count_and_email(self):
+        self.add_matches(1)
+        response, _ = self.search()
+        by_name = {result['name']: result for result in response.data}
+        self.assertEqual(by_name['Alice Owner']['email'], 'owner1000000001@example.com')
+        self.assertEqual(by_name['Alice Friend']['spam_count'], 3)
+
+class ExportTestCase(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.user = User.objects.create_user(name='User1', username='user1', password='password123', phone_number='+1234567890')
+        self.client.force_login(self.user)
+        other = User.objects.create(name='Other', username='other', phone_number='+5550000000')
+        Contact.objects.create(owner=other, name='Not Mine', phone_number='+1999999999')
+        SpamReporters.objects.create(user=other, phone_number='+1999999999', report_count=1)
+
+        self.contacts = [
+            Contact.objects.create(owner=self.user, name=f'Friend, "{index}"', phone_number=f'+155500000{index}') for index in range(3)
+        ]
+        self.now = timezone.now()
+        for index, days_ago in enumerate((10, 1)):
+            report = SpamReporters.objects.create(user=self.user, phone_number=f'+177700000{index}', report_count=index + 1)
+            SpamReporters.objects.filter(id=report.id).update(last_reported_at=self.now - timedelta(days=days_ago))
+
+    def export(self, **params):
+        response = self.client.get(reverse('export'), params)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertTrue(response.streaming)
+        return response, b''.join(response.streaming_content)
+
+    @override_settings(EXPORT_CHUNK_SIZE=2)
+    def test_ndjson_export(self):
+        response, content = self.export()
+
+        rows = [json.loads(line) for line in content.decode().splitlines()]
+        self.assertEqual(response['Content-Type'], 'application/x-ndjson')
+        self.assertEqual([row['type'] for row in rows], ['contact'] * 3 + ['spam_report'] * 2)
+        self.assertEqual(rows[0], {
+            'type': 'contact', 'id': self.contacts[0].id, 'name': 'Friend, "0"', 'phone_number': '+1555000000',
+            'is_spam': False, 'is_anonymous': False,
+        })
+        self.assertEqual([row['phone_number'] for row in rows[3:]], ['+1777000000', '+1777000001'])
+        self.assertTrue(rows[3]['last_reported_at'].endswith('Z'))
+
+    def test_since_limits_the_spam_reports(self):
+        response, content = self.export(since=(self.now - timedelta(days=5)).isoformat())
+
+        rows = [json.loads(line) for line in content.decode().splitlines()]
+        self.assertEqual([row['phone_number'] for row in rows if row['type'] == 'spam_report'], ['+1777000001'])
+        self.assertEqual(len([row for row in rows if row['type'] == 'contact']), 3)
+
+        # The next incremental export starts where this one stopped.
+        SpamReporters.objects.filter(phone_number='+1777000000').update(last_reported_at=timezone.now())
+        _, content = self.export(since=response['X-Export-Until'])
+        rows = [json.loads(line) for line in content.decode().splitlines()]
+        self.assertEqual([row['phone_number'] for row in rows if row['type'] == 'spam_report'], ['+1777000000'])
+
+    def test_next_export_picks_up_reports_committed_late(self):
+        response, _ = self.export(since=self.now.isoformat())
+        until = parse_datetime(response['X-Export-Until'])
+
+        # Stamped before the first export's end, but committed after it read the reports.
+        SpamReporters.objects.filter(phone_number='+1777000000').update(last_reported_at=until - timedelta(seconds=1))
+        _, content = self.export(since=response['X-Export-Until'])
+        rows = [json.loads(line) for line in content.decode().splitlines()]
+        self.assertEqual([row['phone_number'] for row in rows if row['type'] == 'spam_report'], ['+1777000000'])
+
+    @override_settings(EXPORT_CHUNK_SIZE=2)
+    def test_gzipped_csv_export(self):
+        response, content = self.export(output='csv')
+
+        self.assertEqual(response['Content-Type'], 'application/gzip')
+        rows = list(csv.DictReader(StringIO(gzip.decompress(content).decode())))
+        self.assertEqual([row['type'] for row in rows], ['contact'] * 3 + ['spam_report'] * 2)
+        self.assertEqual(rows[1]['name'], 'Friend, "1"')
+        self.assertEqual(rows[4]['report_count'], '2')
+
+    def test_invalid_parameters(self):
+        for params in ({'output': 'xml'}, {'since': 'yesterday'}):
+            response = self.client.get(reverse('export'), params)
+            self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+class SearchQueryPlanTestCase(TestCase):
+    """
+    Token authentication needs no query, so each count is the search's own queries plus the
+    request log insert. The spam score cache is a dummy under test.
+    """
+    def setUp(self):
+        self.client = APIClient()
+        self.user = User.objects.create_user(name='Searcher', username='searcher', password='password123', phone_number='+1234567890')
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {issue_token(self.user)}')
+        self.friend = User.objects.create(name='Alice Friend', username='friend', phone_number='+1555000001', email='friend@example.com')
+        self.quiet = User.objects.create(name='Alice Quiet', username='quiet', phone_number='+1555000002')
+        Contact.objects.create(owner=self.friend, name='Searcher', phone_number='+1234567890')
+        stranger = User.objects.create(name='Stranger', username='stranger', phone_number='+1555000003', email='stranger@example.com')
+        for owner in (self.friend, self.quiet, stranger):
+            Contact.objects.create(owner=owner, name='Bob', phone_number='+1777000000')
+
+    def search(self, queries, **params):
+        with self.assertNumQueries(queries):
+            return self.client.get(reverse('search'), params)
+
+    def test_name_search(self):
+        # Four stages, the page's email visibility and the request log.
+        response = self.search(6, query='Alice')
+        self.assertEqual([result.get('email') for result in response.data], ['friend@example.com', None])
+
+    def test_name_search_without_emails_skips_the_visibility_query(self):
+        response = self.search(5, query='Quiet')
+        self.assertEqual(len(response.data), 1)
+
+    def test_registered_user(self):
+        # User, spam reputation, email visibility, request log.
+        response = self.search(4, phone_number='+1555000001')
+        self.assertEqual(response.data[0]['name'], 'Alice Friend')
+
+    def test_registered_user_without_email_skips_the_visibility_query(self):
+        self.search(3, phone_number='+1555000002')
+
+    def test_contacts(self):
+        # User miss, contacts with their owners' emails, spam reputation, email visibility, request log.
+        response = self.search(5, phone_number='+1777000000', limit=2)
+        self.assertEqual([result.get('email') for result in response.data], ['friend@example.com', None])
+
+    def test_next_contacts_page_skips_the_user_lookup(self):
+        cursor = self.client.get(reverse('search'), {'phone_number': '+1777000000', 'limit': 2})['X-Next-Cursor']
+        response = self.search(4, phone_number='+1777000000', limit=2, cursor=cursor)
+        self.assertEqual(len(response.data), 1)
+
+    def test_unknown_number_skips_the_spam_reputation(self):
+        response = self.search(3, phone_number='+1555000999')
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+class QueryInstrumentationTestCase(TestCase):
+    def setUp(self):
+        metrics.reset()
+        self.client = APIClient()
+        self.user = User.objects.create_user(name='User1', username='user1', password='password123', phone_number='+1234567890')
+        self.client.login(username='user1', password='password123')
+
+    def test_response_reports_query_count_and_db_time(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse('contact-list-create'))
+
+        self.assertEqual(int(response['X-DB-Query-Count']), len(queries))
+        self.assertEqual(response['X-DB-Duplicate-Queries'], '0')
+        self.assertRegex(response['Server-Timing'], r'^db;dur=[0-9.]+;desc="\d+ queries"$')
+
+    def test_repeated_statements_are_counted_as_duplicates(self):
+        recorder = QueryRecorder()
+        with connection.execute_wrapper(recorder):
+            for phone_number in ('+1111111111', '+2222222222', '+3333333333'):
+                Contact.objects.filter(phone_number=phone_number).exists()
+
+        self.assertEqual(recorder.count, 3)
+        self.assertEqual(recorder.duplicates, 2)
+
+    def test_metrics_endpoint_aggregates_per_endpoint_for_staff_only(self):
+        self.client.get(reverse('contact-list-create'))
+        self.client.get(reverse('contact-list-create'))
+
+        response = self.client.get(reverse('query-metrics'))
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+        User.objects.filter(id=self.user.id).update(is_staff=True)
+        response = self.client.get(reverse('query-metrics'))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        stats = response.data['contact-list-create']
+        self.assertEqual(stats['queries']['count'], 2)
+        self.assertEqual(stats['queries']['buckets']['+Inf'], 2)
+
+class MetricsTestCase(TestCase):
+    def setUp(self):
+        metrics.reset()
+        self.client = APIClient()
+        self.user = User.objects.create_user(name='User1', username='user1', password='password123', phone_number='+1234567890')
+        self.client.login(username='user1', password='password123')
+
+    def test_counter_sums_thread_local_shards(self):
+        counter = metrics.Counter('test_total', "Test counter.", ['kind'])
+        threads = [threading.Thread(target=lambda: [counter.inc(kind='a') for _ in range(1000)]) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        counter.inc(2, kind='b')
+
+        self.assertEqual(counter.collect(), {('a',): 4000, ('b',): 2})
+
+    def test_histogram_buckets_are_cumulative(self):
+        histogram = metrics.Histogram('test_seconds', "Test histogram.", buckets=(0.1, 1))
+        for value in (0.05, 0.5, 0.7, 3):
+            histogram.observe(value)
+
+        snapshot = histogram.snapshot(histogram.collect()[()])
+        self.assertEqual(snapshot['buckets'], {'0.1': 1, '1': 3, '+Inf': 4})
+        self.assertEqual(snapshot['count'], 4)
+
+    def test_metrics_endpoint_exports_requests_searches_and_spam_reports(self):
+        self.client.post(reverse('report-spam'), {'phone_number': '+1987654321'})
+        self.client.get(reverse('search'), {'phone_number': '+1987654321'})
+        self.client.get(reverse('search'), {'query': 'Nobody'})
+
+        with self.settings(METRICS_TOKEN='scrape-secret'):
+            response = APIClient().get(reverse('metrics'), HTTP_AUTHORIZATION='Bearer scrape-secret')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertTrue(response['Content-Type'].startswith('text/plain; version=0.0.4'))
+        body = response.content.decode()
+        self.assertIn('spamlookupify_requests_total{view="report-spam",method="POST",status="200"} 1.0', body)
+        self.assertIn('spamlookupify_request_duration_seconds_count{view="search"} 2.0', body)
+        self.assertIn('spamlookupify_spam_reports_total 1.0', body)
+        self.assertIn('spamlookupify_searches_total{kind="phone_number",result="hit"} 1.0', body)
+        self.assertIn('spamlookupify_searches_total{kind="name",result="miss"} 1.0', body)
+        self.assertIn('# TYPE spamlookupify_spam_cache_hit_ratio gauge', body)
+
+    def test_metrics_endpoint_rejects_unknown_clients(self):
+        self.client.logout()
+        response = self.client.get(reverse('metrics'), REMOTE_ADDR='203.0.113.5')
+        self.assertIn(response.status_code, (status.HTTP_401_UNAUTHORIZED, status.HTTP_403_FORBIDDEN))
+
+    def test_local_clients_need_a_token_or_the_allowlist(self):
+        # A reverse proxy on the same host makes every client look local.
+        self.client.logout()
+        with self.settings(METRICS_TOKEN='scrape-secret'):
+            for authorization in ('', 'Bearer wrong'):
+                response = self.client.get(reverse('metrics'), REMOTE_ADDR='127.0.0.1', HTTP_AUTHORIZATION=authorization)
+                self.assertIn(response.status_code, (status.HTTP_401_UNAUTHORIZED, status.HTTP_403_FORBIDDEN))
+
+        with self.settings(METRICS_ALLOWED_IPS=['127.0.0.1']):
+            self.assertEqual(self.client.get(reverse('metrics'), REMOTE_ADDR='127.0.0.1').status_code, status.HTTP_200_OK)
+
+    def test_staff_users_can_scrape(self):
+        self.user.is_staff = True
+        self.user.save()
+        self.assertEqual(self.client.get(reverse('metrics')).status_code, status.HTTP_200_OK)
+
+class AsyncSearchTestCase(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(name='User1', username='user1', password='password123', phone_number='+1234567890')
+        alice = User.objects.create(name='Alice Owner', username='alice', phone_number='+1999000111', email='alice@example.com')
+        Contact.objects.create(owner=alice, name='Alice Contact', phone_number='+1234567890')
+        Contact.objects.create(owner=alice, name='Malice Friend', phone_number='+1122334455')
+        Contact.objects.create(owner=self.user, name='Alicia Keys', phone_number='+1122334455')
+        SpamReputation.objects.create(phone_number='+1122334455', total_reports=2, distinct_reporters=2)
+        self.client = APIClient()
+        self.client.force_login(self.user)
+
+    async def test_matches_the_sync_view(self):
+        await self.async_client.aforce_login(self.user)
+
+        for params in ({'query': 'ali'}, {'query': 'ali', 'limit': 1}, {'phone_number': '+1122334455'}, {'phone_number': '1999000111'}):
+            expected = await sync_to_async(self.client.get)(reverse('search'), params)
+            response = await self.async_client.get(reverse('search-async'), params)
+
+            self.assertEqual(response.status_code, expected.status_code)
+            self.assertEqual(response.json(), expected.json())
+            self.assertEqual(response.has_header('X-Next-Cursor'), expected.has_header('X-Next-Cursor'))
+
+    async def test_accepts_signed_tokens_and_rejects_anonymous_requests(self):
+        response = await self.async_client.get(reverse('search-async'), {'query': 'ali'})
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+        response = await self.async_client.get(
+            reverse('search-async'), {'query': 'ali'}, headers={'Authorization': f'Bearer {issue_token(self.user)}'},
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    async def test_missing_number_is_a_404(self):
+        await self.async_client.aforce_login(self.user)
+        response = await self.async_client.get(reverse('search-async'), {'phone_number': '+1555000999'})
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+        self.assertEqual(response.json(), {"error": "No contacts found."})
+
+class SearchPaginationTestCase(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.user = User.objects.create_user(name='User1', username='user1', password='password123', phone_number='+1234567890')
+        self.client.login(username='user1', password='password123')
+        User.objects.create(name='Carol User', username='carol', phone_number='+3000000000')
+        Contact.objects.create(owner=self.user, name='Carol Shadow', phone_number='+3000000000')
+        for index in range(5):
+            Contact.objects.create(owner=self.user, name=f'Carol {index}', phone_number=f'+300000000{index + 1}')
+        other = User.objects.create(name='Other', username='other', phone_number='+4000000000')
+        Contact.objects.create(owner=other, name='Carol Duplicate', phone_number='+3000000001')
+
+    def collect_pages(self, params):
+        pages = []
+        cursor = None
+        while True:
+            page_params = dict(params, limit=2)
+            if cursor:
+                page_params['cursor'] = cursor
+            response = self.client.get(reverse('search'), page_params)
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            pages.append(response.data)
+            cursor = response.get('X-Next-Cursor')
+            if not cursor:
+                return pages
+
+    def test_name_search_pages_are_deduplicated(self):
+        pages = self.collect_pages({'query': 'Carol'})
+        phone_numbers = [result['phone_number'] for page in pages for result in page]
+        self.assertTrue(all(len(page) <= 2 for page in pages))
+        self.assertEqual(len(phone_numbers), 6)
+        self.assertEqual(len(set(phone_numbers)), 6)
+        self.assertEqual(pages[0][0]['name'], 'Carol User')
+
+    @override_settings(RATELIMIT={'ENABLED': True, 'CACHE': 'throttle'})
+    def test_following_pages_are_not_throttled(self):
+        caches['throttle'].clear()
+        self.assertEqual(len(self.collect_pages({'query': 'Carol'})), 3)
+
+    def test_phone_number_search_pages(self):
+        pages = self.collect_pages({'phone_number': '+3000000001'})
+        names = [result['name'] for page in pages for result in page]
+        self.assertEqual(names, ['Carol 0', 'Carol Duplicate'])
+
+    def test_invalid_cursor(self):
+        response = self.client.get(reverse('search'), {'query': 'Carol', 'cursor': 'bogus'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+class RankedNameSearchTestCase(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.user = User.objects.create_user(name='User1', username='user1', password='password123', phone_number='+1234567890')
+        self.client.login(username='user1', password='password123')
+
+    def search_names(self, query):
+        response = self.client.get(reverse('search'), {'query': query})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return [result['name'] for result in response.data]
+
+    def test_prefix_matches_rank_before_substring_matches(self):
+        Contact.objects.create(owner=self.user, name='Bob Alison', phone_number='+1000000001')
+        User.objects.create(name='Mallory', username='mallory', phone_number='+1000000002')
+        Contact.objects.create(owner=self.user, name='Alina Grey', phone_number='+1000000003')
+        User.objects.create(name='Ali Khan', username='ali', phone_number='+1000000004')
+
+        self.assertEqual(self.search_names('ali'), ['Ali Khan', 'Alina Grey', 'Bob Alison'])
+        self.assertEqual(self.search_names('LL'), ['Mallory'])
+
+    def test_index_follows_renames_and_deletes(self):
+        contact = Contact.objects.create(owner=self.user, name='Zed Old', phone_number='+1000000001')
+        contact.name = 'Zed New'
+        contact.save()
+        self.assertEqual(self.search_names('new'), ['Zed New'])
+        self.assertEqual(self.search_names('old'), [])
+
+        contact.delete()
+        self.assertEqual(self.search_names('zed'), [])
+
+    def test_long_queries_match_the_full_name(self):
+        Contact.objects.create(owner=self.user, name='Maximilian Alexander One', phone_number='+1000000001')
+        Contact.objects.create(owner=self.user, name='Maximilian Alexander Two', phone_number='+1000000002')
+        self.assertEqual(self.search_names('maximilian alexander two'), ['Maximilian Alexander Two'])
+
+    def test_blank_queries_match_nothing(self):
+        Contact.objects.create(owner=self.user, name='Bob Alison', phone_number='+1000000001')
+        self.assertEqual(self.search_names('   '), [])
+
+    @override_settings(SEARCH_MAX_CANDIDATES=2)
+    def test_broad_queries_keep_the_closest_candidates(self):
+        for index, name in enumerate(['Johnson', 'John', 'Johnny', 'Big John']):
+            Contact.objects.create(owner=self.user, name=name, phone_number=f'+100000000{index}')
+        self.assertEqual(self.search_names('john'), ['John', 'Johnny', 'Big John'])
+
+class RequestLogWriterTestCase(TestCase):
+    def entry(self, index):
+        return RequestLog(request_type='GET', request_path=f'/api/search/{index}', data={})
+
+    def test_flush_writes_queued_entries_in_batches(self):
+        writer = RequestLogWriter(batch_size=2, flush_interval=0.01, max_queue_size=10)
+        for index in range(5):
+            writer.submit(self.entry(index))
+        self.assertEqual(RequestLog.objects.count(), 0)
+
+        with self.assertNumQueries(3):
+            writer.flush()
+        self.assertEqual(RequestLog.objects.count(), 5)
+
+    def test_full_queue_drops_entries(self):
+        writer = RequestLogWriter(batch_size=10, flush_interval=0.01, max_queue_size=3)
+        for index in range(5):
+            writer.submit(self.entry(index))
+        self.assertEqual(writer.dropped, 2)
+
+        writer.flush()
+        self.assertEqual(RequestLog.objects.count(), 3)
+
+    def test_middleware_logs_synchronously_in_tests(self):
+        self.client.get(reverse('search'))
+        self.assertTrue(RequestLog.objects.filter(request_path='/api/search/').exists())
+
+    def test_entries_are_bucketed_by_utc_day(self):
+        writer = RequestLogWriter(batch_size=10, flush_interval=0.01, max_queue_size=10)
+        entry = self.entry(0)
+        entry.timestamp = timezone.now().replace(year=2026, month=3, day=1, hour=23, minute=30)
+        writer.submit(entry)
+        writer.flush()
+
+        self.assertEqual(RequestLog.objects.get().day.isoformat(), '2026-03-01')
+
+class RequestLogRetentionTestCase(TestCase):
+    def setUp(self):
+        self.archive_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.archive_dir.cleanup)
+        self.now = timezone.now()
+
+    def log(self, path, days_ago):
+        return RequestLog.objects.create(
+            request_type='GET', request_path=path, data={'query': 'ali'}, timestamp=self.now - timedelta(days=days_ago),
+        )
+
+    def prune(self, *args):
+        settings = {
+            'DEFAULT_DAYS': 30,
+            'PATHS': {'/api/login/': 90, '/api/': 7, '/api/search/': 14},
+            'ARCHIVE_DIR': self.archive_dir.name,
+            'BATCH_SIZE': 2,
+        }
+        with override_settings(REQUEST_LOG_RETENTION=settings):
+            output = StringIO()
+            call_command('prune_request_logs', *args, stdout=output)
+            return output.getvalue()
+
+    def test_longest_matching_prefix_sets_retention(self):
+        kept = [self.log('/api/login/', 60), self.log('/api/search/', 10), self.log('/api/contacts/', 5), self.log('/admin/', 20)]
+        self.log('/api/login/', 100)
+        self.log('/api/search/', 20)
+        self.log('/api/contacts/', 10)
+        self.log('/admin/', 40)
+
+        output = self.prune()
+
+        self.assertIn("Pruned 4 request logs.", output)
+        self.assertEqual(set(RequestLog.objects.values_list('id', flat=True)), {log.id for log in kept})
+
+    def test_expired_rows_are_archived_per_day(self):
+        expired = [self.log('/api/search/', 20) for _ in range(3)] + [self.log('/api/search/', 21)]
+        self.log('/api/search/', 1)
+
+        self.prune()
+
+        archived = {}
+        for path in Path(self.archive_dir.name).glob('requestlog-*.ndjson.gz'):
+            with gzip.open(path, 'rt') as archive_file:
+                archived[path.name] = [json.loads(line) for line in archive_file]
+
+        day = lambda log: f'requestlog-{log.day.isoformat()}.ndjson.gz'
+        self.assertEqual(sorted(archived), sorted({day(expired[0]), day(expired[3])}))
+        self.assertEqual([row['id'] for row in archived[day(expired[0])]], [log.id for log in expired[:3]])
+        self.assertEqual(archived[day(expired[3])][0]['data'], {'query': 'ali'})
+        self.assertEqual(RequestLog.objects.count(), 1)
+
+    def test_dry_run_only_counts(self):
+        self.log('/admin/', 40)
+
+        output = self.prune('--dry-run')
+
+        self.assertIn("Would prune 1 request logs.", output)
+        self.assertEqual(RequestLog.objects.count(), 1)
+        self.assertEqual(list(Path(self.archive_dir.name).iterdir()), [])
+
+class ConcurrentSpamReportTestCase(TransactionTestCase):
+    def test_parallel_reports_are_counted_exactly(self):
+        reporters = [
+            User.objects.create(name=f'Reporter {index}', username=f'reporter{index}', phone_number=f'+600000000{index}')
+            for index in range(8)
+        ]
+        reports_per_user = 5
+        barrier = threading.Barrier(len(reporters))
+        errors = []
+
+        def report(user):
+            client = APIClient()
+            client.force_authenticate(user)
+            barrier.wait()
+            try:
+                for _ in range(reports_per_user):
+                    response = client.post(reverse('report-spam'), {'phone_number': '+1122334455'})
+                    if response.status_code != status.HTTP_200_OK:
+                        errors.append(response.status_code)
+            finally:
+                connections.close_all()
+
+        threads = [threading.Thread(target=report, args=(user,)) for user in reporters]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(errors, [])
+        self.assertEqual(SpamReputation.objects.get(phone_number='+1122334455').total_reports, len(reporters) * reports_per_user)
+        self.assertEqual(
+            sorted(SpamReporters.objects.values_list('report_count', flat=True)),
+            [reports_per_user] * len(reporters),
+        )
+
+@skipUnless(connection.vendor == 'sqlite', 'Query plans are checked with SQLite EXPLAIN QUERY PLAN.')
+class QueryPlanTestCase(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.user = User.objects.create_user(name='User1', username='user1', password='password123', phone_number='+1234567890')
+        self.client.login(username='user1', password='password123')
+        self.other = User.objects.create(name='Alice Owner', username='alice', phone_number='+1999000111', email='alice@example.com')
+        Contact.objects.create(owner=self.other, name='Alice Contact', phone_number='+1234567890')
+        self.contact = Contact.objects.create(owner=self.user, name='Alicia Keys', phone_number='+1122334455')
+        SpamReputation.objects.create(phone_number='+1122334455', total_reports=2, distinct_reporters=1)
+
+    def assert_no_table_scans(self, method, *args, **kwargs):
+        with CaptureQueriesContext(connection) as queries:
+            response = method(*args, **kwargs)
+        self.assertLess(response.status_code, 400)
+
+        with connection.cursor() as cursor:
+            for query in queries:
+                if not query['sql'].lstrip().upper().startswith(('SELECT', 'UPDATE', 'DELETE')):
+                    continue
+                cursor.execute('EXPLAIN QUERY PLAN ' + query['sql'])
+                scans = [row[-1] for row in cursor.fetchall() if row[-1].startswith('SCAN') and row[-1] != 'SCAN CONSTANT ROW']
+                self.assertEqual(scans, [], query['sql'])
+
+    def test_name_search(self):
+        self.assert_no_table_scans(self.client.get, reverse('search'), {'query': 'ali'})
+        self.assert_no_table_scans(self.client.get, reverse('search'), {'query': 'ice'})
+
+    def test_phone_number_search(self):
+        self.assert_no_table_scans(self.client.get, reverse('search'), {'phone_number': '+1999000111'})
+        self.assert_no_table_scans(self.client.get, reverse('search'), {'phone_number': '+1122334455'})
+
+    def test_spam_reports(self):
+        self.assert_no_table_scans(self.client.post, reverse('report-spam'), {'phone_number': '+1122334455'})
+        self.assert_no_table_scans(
+            self.client.post, reverse('report-spam-bulk'), {'phone_numbers': ['+1122334455', '+1555000111']}, format='json'
+        )
+
+    def test_contacts(self):
+        self.assert_no_table_scans(self.client.get, reverse('contact-list-create'))
+        self.assert_no_table_scans(self.client.post, reverse('contact-list-create'), {'name': 'Bob', 'phone_number': '+1555000111'})
+        self.assert_no_table_scans(self.client.get, reverse('contact-detail', args=[self.contact.id]))
+        self.assert_no_table_scans(self.client.put, reverse('contact-detail', args=[self.contact.id]), {'name': 'Alicia'})
+        self.assert_no_table_scans(
+            self.client.post, reverse('contact-bulk') + '?mode=sync', [{'name': 'Bob', 'phone_number': '+1555000112'}], format='json'
+        )
+
+class BenchmarkSuiteTestCase(TestCase):
+    def test_scenarios_report_latency_and_query_counts(self):
+        user = User.objects.create_user(name='User1', username='user1', password='password123', phone_number='+1234567890')
+        Contact.objects.create(owner=user, name='Alice Anderson', phone_number='+1122334455')
+
+        results = benchmarks.run(['search_name', 'search_phone_number', 'contacts_list'], requests=3)
+
+        for result in results.values():
+            self.assertEqual(result['errors'], 0)
+            self.assertEqual(set(result['latency_ms']), {'p50', 'p95', 'p99', 'mean'})
+            self.assertGreater(result['queries_per_request']['mean'], 0)
+
+class PopulateDatabaseTestCase(TestCase):
+    def populate(self, **options):
+        call_command('populate_db', users=20, contacts_per_user=5, spam_reports=100, seed=7, stdout=StringIO(), **options)
+        return (
+            list(User.objects.order_by('id').values_list('name', 'phone_number')),
+            list(Contact.objects.order_by('id').values_list('name', 'phone_number')),
+            list(SpamReputation.objects.order_by('phone_number').values_list('phone_number', 'total_reports')),
+        )
+
+    def test_generates_requested_rows(self):
+        self.populate()
+
+        self.assertEqual(User.objects.count(), 20)
+        self.assertEqual(Contact.objects.count(), 100)
+        self.assertEqual(sum(SpamReputation.objects.values_list('total_reports', flat=True)), 100)
+        self.assertEqual(sum(SpamReporters.objects.values_list('report_count', flat=True)), 100)
+        self.assertEqual(len(set(User.objects.values_list('password', flat=True))), 1)
+
+        contact = Contact.objects.order_by('id').first()
+        self.assertTrue(contact.name_terms.filter(offset=0).exists())
+
+    def test_same_seed_gives_same_dataset(self):
+        first = self.populate()
+        User.objects.all().delete()
+        SpamReputation.objects.all().delete()
+
+        self.assertEqual(self.populate(), first)
+
+    def test_rejects_more_registered_contacts_than_users(self):
+        with self.assertRaises(CommandError):
+            call_command('populate_db', users=3, contacts_per_user=5, registered_ratio=1, stdout=StringIO())
+        self.assertFalse(User.objects.exists())
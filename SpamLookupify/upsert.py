@@ -0,0 +1,87 @@
+from django.db import connections, router, transaction, IntegrityError
+from django.db.models import F
+from django.db.models.functions import Power
+
+# Rows per INSERT statement; keeps the parameter count under SQLite's limit.
+BATCH_SIZE = 500
+
+def increment_or_create(model, conflict_fields, rows, increments, updates=(), decay=None):
+    """
+    Insert ``rows`` (dicts keyed by field attname) into ``model``. A row that collides with an
+    existing one on ``conflict_fields`` instead adds its ``increments`` values to the stored
+    ones and overwrites the ``updates`` fields, as one atomic statement per batch. ``rows``
+    must not repeat a conflict key.
+
+    ``decay`` is an optional ``(field, time_field, half_life)``: ``field`` holds a value that
+    halves every ``half_life`` seconds, as of ``time_field`` (Unix seconds). The stored value
+    is first decayed to the incoming row's time, then the incoming value is added and
+    ``time_field`` moves to that time.
+    """
+    if not rows:
+        return
+
+    using = router.db_for_write(model)
+    connection = connections[using]
+
+    with transaction.atomic(using=using):
+        if connection.vendor in ('sqlite', 'postgresql'):
+            for start in range(0, len(rows), BATCH_SIZE):
+                upsert(connection, model, conflict_fields, rows[start:start + BATCH_SIZE], increments, updates, decay)
+        else:
+            for row in rows:
+                update_or_insert(model, using, conflict_fields, row, increments, updates, decay)
+
+def upsert(connection, model, conflict_fields, rows, increments, updates, decay=None):
+    opts = model._meta
+    quote = connection.ops.quote_name
+    fields = [(name, opts.get_field(name)) for name in rows[0]]
+    table = quote(opts.db_table)
+
+    placeholders = '(' + ', '.join(['%s'] * len(fields)) + ')'
+    params = [
+        field.get_db_prep_save(row[name], connection)
+        for row in rows
+        for name, field in fields
+    ]
+    assignments = [
+        f'{quote(column)} = {table}.{quote(column)} + EXCLUDED.{quote(column)}'
+        for column in (opts.get_field(name).column for name in increments)
+    ] + [
+        f'{quote(column)} = EXCLUDED.{quote(column)}'
+        for column in (opts.get_field(name).column for name in updates)
+    ]
+    if decay is not None:
+        column, time_column = (quote(opts.get_field(name).column) for name in decay[:2])
+        assignments += [
+            f'{column} = {table}.{column} * POWER(2, ({table}.{time_column} - EXCLUDED.{time_column}) / %s) + EXCLUDED.{column}',
+            f'{time_column} = EXCLUDED.{time_column}',
+        ]
+        params.append(float(decay[2]))
+
+    sql = (
+        f'INSERT INTO {table} ({", ".join(quote(field.column) for _, field in fields)}) '
+        f'VALUES {", ".join([placeholders] * len(rows))} '
+        f'ON CONFLICT ({", ".join(quote(opts.get_field(name).column) for name in conflict_fields)}) '
+        f'DO UPDATE SET {", ".join(assignments)}'
+    )
+
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+
+def update_or_insert(model, using, conflict_fields, row, increments, updates, decay=None):
+    lookup = {name: row[name] for name in conflict_fields}
+    changes = {name: F(name) + row[name] for name in increments}
+    changes.update({name: row[name] for name in updates})
+    if decay is not None:
+        field, time_field, half_life = decay
+        changes[field] = F(field) * Power(2.0, (F(time_field) - row[time_field]) / float(half_life)) + row[field]
+        changes[time_field] = row[time_field]
+
+    if model._default_manager.using(using).filter(**lookup).update(**changes):
+        return
+
+    try:
+        with transaction.atomic(using=using):
+            model._default_manager.using(using).create(**row)
+    except IntegrityError:
+        model._default_manager.using(using).filter(**lookup).update(**changes)
@@ -1,12 +1,18 @@
 from django.urls import path
+from .async_views import AsyncSearchView
 from .views import (
     RegisterView,
     LoginView,
     ContactListCreateView,
+    ContactBulkView,
     ContactDetailView,
     ReportSpamView,
+    BulkReportSpamView,
+    ExportView,
     SearchView,
     LogoutView,
+    QueryMetricsView,
+    MetricsView,
 )
 
 urlpatterns = [
@@ -14,7 +20,13 @@ urlpatterns = [
     path('api/login/', LoginView.as_view(), name='login'),
     path('api/logout/', LogoutView.as_view(), name='logout'),
     path('api/contacts/', ContactListCreateView.as_view(), name='contact-list-create'),
+    path('api/contacts/bulk/', ContactBulkView.as_view(), name='contact-bulk'),
     path('api/contacts/<int:contact_id>/', ContactDetailView.as_view(), name='contact-detail'),
     path('api/report-spam/', ReportSpamView.as_view(), name='report-spam'),
+    path('api/report-spam/bulk/', BulkReportSpamView.as_view(), name='report-spam-bulk'),
+    path('api/export/', ExportView.as_view(), name='export'),
     path('api/search/', SearchView.as_view(), name='search'),
+    path('api/async/search/', AsyncSearchView.as_view(), name='search-async'),
+    path('api/metrics/queries/', QueryMetricsView.as_view(), name='query-metrics'),
+    path('metrics', MetricsView.as_view(), name='metrics'),
 ]
\ No newline at end of file
@@ -1,26 +1,105 @@
 import re
+from collections import Counter
+from datetime import timedelta
+from django.conf import settings
 from django.contrib.auth import authenticate, login, logout
-from django.db.models import Q, Count
 from rest_framework import generics, status, permissions
 from rest_framework.views import APIView
+from rest_framework.authentication import SessionAuthentication, BasicAuthentication
 from rest_framework.response import Response
-from .models import User, Contact, SpamReport, SpamReporters
+from rest_framework.parsers import JSONParser
+from .models import Contact, SpamReporters
 from .serializers import UserSerializer, ContactSerializer, SpamReportSerializer
-from .permissions import IsOwnerOrReadOnly
+from .permissions import IsOwnerOrReadOnly, IsMetricsScraper
+from .authentication import SignedTokenAuthentication, issue_token, get_config as get_token_config
+from .parsers import NDJSONParser
+from .search_index import index_contacts
+from .search import name_search_stages, name_search_results, registered_user_query, registered_user_result, phone_number_contacts, phone_number_contact_results
+from .upsert import increment_or_create
+from .phone import normalize_phone_number
+from . import spam_cache, metrics, reputation, contact_versions
+from .pagination import get_page_size, decode_cursor, paginate_stages, paginated_response
+from .export import export_rows, ndjson_stream, gzipped_csv_stream, get_since_overlap
 from django.shortcuts import get_object_or_404
+from django.utils.decorators import method_decorator
+from django.views.decorators.cache import cache_control
+from django.views.decorators.http import condition
+from django.http import HttpResponse, StreamingHttpResponse
+from django.utils.dateparse import parse_datetime
+from django.db import transaction
 from rest_framework.exceptions import ValidationError
 from django.utils import timezone
-from .ratelimit import RegisterThrottle, LoginThrottle, LogoutThrottle, ContactThrottle, ReportSpamThrottle, SearchThrottle
+from .ratelimit import RegisterThrottle, LoginThrottle, LogoutThrottle, ContactThrottle, ReportSpamThrottle, SearchThrottle, ExportThrottle
 
 def validate_phone_number(phone_number):
     phone_regex = r'^\+?1?\d{9,15}$'
-    if not re.match(phone_regex, phone_number):
+    if not re.match(phone_regex, phone_number) or normalize_phone_number(phone_number) is None:
         raise ValidationError({"error": "Invalid phone number format. Please use the format: '+999999999' or '999999999'."})
 
+def record_spam_reports(user, counts):
+    """
+    Apply ``counts`` (canonical phone number -> number of reports) filed by ``user`` with set-based
+    statements: flag every contact holding a number, save an anonymous contact for numbers
+    nobody has saved and add the counts to SpamReporters and SpamReputation.
+    """
+    phone_numbers = list(counts)
+
+    with transaction.atomic():
+        # Taken once the write lock is held, so the reports commit shortly after their timestamp.
+        now = timezone.now()
+        known_numbers = set(
+            Contact.objects.filter(normalized_phone_number__in=phone_numbers)
+            .values_list('normalized_phone_number', flat=True).distinct()
+        )
+        flagged = Contact.objects.filter(normalized_phone_number__in=known_numbers, is_spam=False)
+        contact_versions.touch(flagged.values('owner_id'))
+        flagged.update(is_spam=True)
+
+        unknown_numbers = [phone_number for phone_number in phone_numbers if phone_number not in known_numbers]
+        if unknown_numbers:
+            Contact.objects.bulk_create(
+                [
+                    Contact(
+                        owner=user, name="Anonymous", phone_number=phone_number, normalized_phone_number=phone_number,
+                        is_anonymous=True, is_spam=True,
+                    )
+                    for phone_number in unknown_numbers
+                ],
+                ignore_conflicts=True,
+            )
+            index_contacts(Contact.objects.filter(owner=user, normalized_phone_number__in=unknown_numbers).only('id', 'name'))
+            contact_versions.touch([user.id])
+
+        reported_before = set(
+            SpamReporters.objects.filter(user=user, phone_number__in=phone_numbers).values_list('phone_number', flat=True)
+        )
+        increment_or_create(
+            SpamReporters,
+            conflict_fields=['user_id', 'phone_number'],
+            rows=[
+                {
+                    "user_id": user.id,
+                    "phone_number": phone_number,
+                    "report_count": count,
+                    "first_reported_at": now,
+                    "last_reported_at": now,
+                }
+                for phone_number, count in counts.items()
+            ],
+            increments=['report_count'],
+            updates=['last_reported_at'],
+        )
+
+        reputation.record(counts, set(phone_numbers) - reported_before, now)
+
+        spam_cache.invalidate(phone_numbers)
+
+    metrics.SPAM_REPORTS.inc(sum(counts.values()))
+
 class RegisterView(APIView):
     serializer_class = UserSerializer
     permission_classes = [permissions.AllowAny]
-    # throttle_classes = [RegisterThrottle]
+    throttle_classes = [RegisterThrottle]
 
     def post(self, request):
         serializer = self.serializer_class(data=request.data)
@@ -30,7 +109,7 @@ class RegisterView(APIView):
 
 class LoginView(APIView):
     permission_classes = [permissions.AllowAny]
-    # throttle_classes = [LoginThrottle]
+    throttle_classes = [LoginThrottle]
 
     def post(self, request):
         if request.user.is_authenticated:
@@ -44,49 +123,157 @@ class LoginView(APIView):
         user = authenticate(request, username=username, password=password)
 
         if user is not None:
+            if request.data.get('auth') == 'token':
+                return Response(
+                    {"message": "Login successful", "token": issue_token(user), "expires_in": get_token_config()['MAX_AGE']},
+                    status=status.HTTP_200_OK
+                )
+
             login(request, user)
             return Response({"message": "Login successful"}, status=status.HTTP_200_OK)
         
         return Response({"message": "Invalid credentials. Please verify your login details or register for a new account."}, status=status.HTTP_401_UNAUTHORIZED)
 
 class LogoutView(APIView):
-    # throttle_classes = [LogoutThrottle]
+    throttle_classes = [LogoutThrottle]
 
     def post(self, request):
+        if isinstance(request.successful_authenticator, SignedTokenAuthentication):
+            return Response({'message': 'Tokens are not stored on the server; discard the token, it expires on its own.'}, status=status.HTTP_200_OK)
+
         if request.user.is_authenticated:
             logout(request)
             return Response({'message': 'Successfully logged out.'}, status=status.HTTP_200_OK)
         else:
             return Response({'detail': 'You are already logged out.'}, status=status.HTTP_400_BAD_REQUEST)
 
+# Conditional GETs for polling clients: a matching If-None-Match or If-Modified-Since gets a 304
+# after one version lookup, before any contact is loaded. The responses are per user and must
+# be revalidated every time.
+contact_list_conditions = [
+    cache_control(private=True, no_cache=True),
+    condition(etag_func=contact_versions.list_etag, last_modified_func=contact_versions.list_last_modified),
+]
+contact_detail_conditions = [
+    cache_control(private=True, no_cache=True),
+    condition(etag_func=contact_versions.detail_etag, last_modified_func=contact_versions.detail_last_modified),
+]
+
 class ContactListCreateView(APIView):
     serializer_class = ContactSerializer
     permission_classes = [permissions.IsAuthenticated]
-    # throttle_classes = [ContactThrottle]
+    throttle_classes = [ContactThrottle]
 
+    @method_decorator(contact_list_conditions)
     def get(self, request):
-        contacts = Contact.objects.filter(owner=request.user)
-        serializer = self.serializer_class(contacts, many=True)
-        return Response(serializer.data)
+        # Rows go straight to the renderer; the serializer's fields, without its per-object cost.
+        contacts = Contact.objects.filter(owner=request.user).values(*self.serializer_class.Meta.fields)
+        return Response(list(contacts))
 
     def post(self, request):
         serializer = self.serializer_class(data=request.data)
         serializer.is_valid(raise_exception=True)
         
-        phone_number = serializer.validated_data.get('phone_number')
-        existing_contact = Contact.objects.filter(owner=request.user, phone_number=phone_number).first()
+        phone_number = normalize_phone_number(serializer.validated_data.get('phone_number'))
+        existing_contact = Contact.objects.filter(owner=request.user, normalized_phone_number=phone_number).first()
 
         if existing_contact:
             raise ValidationError({'error': 'A contact with this phone number already exists.'})
 
         serializer.save(owner=request.user)
+        contact_versions.touch([request.user.id])
         return Response(serializer.data, status=status.HTTP_201_CREATED)
         
+class ContactBulkView(APIView):
+    serializer_class = ContactSerializer
+    permission_classes = [permissions.IsAuthenticated]
+    throttle_classes = [ContactThrottle]
+    parser_classes = [JSONParser, NDJSONParser]
+    update_fields = ['name', 'is_spam', 'is_anonymous']
+
+    def post(self, request):
+        mode = request.query_params.get('mode', 'import')
+        if mode not in ('import', 'sync'):
+            return Response({"error": "mode must be either 'import' or 'sync'."}, status=status.HTTP_400_BAD_REQUEST)
+
+        if not isinstance(request.data, list):
+            return Response({"error": "Expected a JSON array or NDJSON stream of contacts."}, status=status.HTTP_400_BAD_REQUEST)
+
+        max_contacts = getattr(settings, 'BULK_CONTACT_MAX_CONTACTS', 10000)
+        if len(request.data) > max_contacts:
+            return Response({"error": f"At most {max_contacts} contacts can be uploaded at once."}, status=status.HTTP_400_BAD_REQUEST)
+
+        serializer = self.serializer_class(data=request.data, many=True)
+        serializer.is_valid(raise_exception=True)
+
+        # The last occurrence of a phone number in the upload wins.
+        incoming = {normalize_phone_number(contact['phone_number']): contact for contact in serializer.validated_data}
+
+        with transaction.atomic():
+            stored = Contact.objects.filter(owner=request.user)
+            if mode == 'import':
+                stored = stored.filter(normalized_phone_number__in=list(incoming))
+            existing = {
+                contact.normalized_phone_number: contact
+                for contact in stored.only('id', 'normalized_phone_number', *self.update_fields)
+            }
+
+            created = [
+                Contact(owner=request.user, normalized_phone_number=phone_number, **contact)
+                for phone_number, contact in incoming.items()
+                if phone_number not in existing
+            ]
+            Contact.objects.bulk_create(created)
+            if created and created[0].pk is None:
+                created = Contact.objects.filter(
+                    owner=request.user,
+                    normalized_phone_number__in=[contact.normalized_phone_number for contact in created],
+                )
+            index_contacts(created)
+
+            updated = []
+            renamed = []
+            deleted = []
+            if mode == 'sync':
+                for phone_number, contact in existing.items():
+                    if phone_number not in incoming:
+                        # Anonymous contacts stand for numbers the user reported, not for their address book.
+                        if not contact.is_anonymous:
+                            deleted.append(contact.id)
+                        continue
+
+                    changes = {
+                        field: value
+                        for field, value in incoming[phone_number].items()
+                        if field in self.update_fields and getattr(contact, field) != value
+                    }
+                    if changes:
+                        if 'name' in changes:
+                            renamed.append(contact)
+                        for field, value in changes.items():
+                            setattr(contact, field, value)
+                        updated.append(contact)
+
+                Contact.objects.bulk_update(updated, self.update_fields, batch_size=500)
+                index_contacts(renamed)
+                Contact.objects.filter(id__in=deleted).delete()
+
+            if created or updated or deleted:
+                contact_versions.touch([request.user.id])
+
+        return Response({
+            "created": len(created),
+            "updated": len(updated),
+            "deleted": len(deleted),
+            "unchanged": len(incoming) - len(created) - len(updated),
+        }, status=status.HTTP_200_OK)
+
 class ContactDetailView(APIView):
     serializer_class = ContactSerializer
     permission_classes = [permissions.IsAuthenticated]
-    # throttle_classes = [ContactThrottle]
+    throttle_classes = [ContactThrottle]
 
+    @method_decorator(contact_detail_conditions)
     def get(self, request, contact_id):
         contact = self.get_object(request, contact_id)
         serializer = self.serializer_class(contact)
@@ -97,11 +284,13 @@ class ContactDetailView(APIView):
         serializer = self.serializer_class(contact, data=request.data, partial=True)
         serializer.is_valid(raise_exception=True)
         serializer.save()
+        contact_versions.touch([contact.owner_id])
         return Response(serializer.data)
 
     def delete(self, request, contact_id):
         contact = self.get_object(request, contact_id)
         contact.delete()
+        contact_versions.touch([contact.owner_id])
         return Response(status=status.HTTP_204_NO_CONTENT)
     
     def get_object(self, request, contact_id):
@@ -117,7 +306,7 @@ class ContactDetailView(APIView):
 
 class ReportSpamView(APIView):
     permission_classes = [permissions.IsAuthenticated]
-    # throttle_classes = [ReportSpamThrottle]
+    throttle_classes = [ReportSpamThrottle]
 
     def post(self, request):
         phone_number = request.data.get('phone_number')
@@ -125,39 +314,97 @@ class ReportSpamView(APIView):
             return Response({"error": "Phone number is required"}, status=status.HTTP_400_BAD_REQUEST)
         
         validate_phone_number(phone_number)
-        
-        user = User.objects.filter(phone_number=phone_number).first()
+        phone_number = normalize_phone_number(phone_number)
 
-        if request.user == user:
+        if phone_number == normalize_phone_number(request.user.phone_number):
             return Response({"error": "You are not allowed to mark your own number as spam."}, status=status.HTTP_400_BAD_REQUEST)
-        
-        try:
-            contact = Contact.objects.get(phone_number=phone_number)
-        except Contact.DoesNotExist:
-            contact = Contact.objects.create(
-                owner=request.user,         
-                name="Anonymous",           
-                phone_number=phone_number,
-                is_anonymous=True
-            )
-        
-        contact.is_spam = True
-        contact.save()
-    
-        spam_report, created = SpamReport.objects.get_or_create(phone_number=phone_number)
-        spam_report.increment_spam_count()
-        spam_report.save()
 
-        spam_reporter, created = SpamReporters.objects.get_or_create(phone_number=phone_number, user=request.user)
-        spam_reporter.increment_report_count()
-        spam_reporter.last_reported_at = timezone.now()
-        spam_reporter.save()
+        record_spam_reports(request.user, {phone_number: 1})
 
         return Response({"message": "Marked as spam"}, status=status.HTTP_200_OK)
 
+class BulkReportSpamView(APIView):
+    permission_classes = [permissions.IsAuthenticated]
+    throttle_classes = [ReportSpamThrottle]
+
+    def post(self, request):
+        # {"phone_numbers": [...]}, or the list on its own.
+        phone_numbers = request.data.get('phone_numbers') if isinstance(request.data, dict) else request.data
+        if not isinstance(phone_numbers, list) or not phone_numbers:
+            return Response({"error": "phone_numbers must be a non-empty list."}, status=status.HTTP_400_BAD_REQUEST)
+
+        max_numbers = getattr(settings, 'BULK_REPORT_MAX_NUMBERS', 5000)
+        if len(phone_numbers) > max_numbers:
+            return Response({"error": f"At most {max_numbers} phone numbers can be reported at once."}, status=status.HTTP_400_BAD_REQUEST)
+
+        results = []
+        counts = Counter()
+        own_number = normalize_phone_number(request.user.phone_number)
+
+        for phone_number in phone_numbers:
+            try:
+                if not isinstance(phone_number, str):
+                    raise ValidationError({"error": "Phone numbers must be strings."})
+                validate_phone_number(phone_number)
+            except ValidationError:
+                results.append({"phone_number": phone_number, "status": "invalid"})
+                continue
+
+            normalized = normalize_phone_number(phone_number)
+            if normalized == own_number:
+                results.append({"phone_number": phone_number, "status": "own_number"})
+                continue
+
+            counts[normalized] += 1
+            results.append({"phone_number": phone_number, "status": "reported"})
+
+        if counts:
+            record_spam_reports(request.user, counts)
+
+        return Response({"reported": sum(counts.values()), "results": results}, status=status.HTTP_200_OK)
+
+class ExportView(APIView):
+    """
+    Streams the user's contacts and the spam reports they filed, as NDJSON or gzipped CSV.
+    """
+    permission_classes = [permissions.IsAuthenticated]
+    throttle_classes = [ExportThrottle]
+
+    def get(self, request):
+        output = request.query_params.get('output', 'ndjson')
+        if output not in ('ndjson', 'csv'):
+            return Response({"error": "output must be either 'ndjson' or 'csv'."}, status=status.HTTP_400_BAD_REQUEST)
+
+        since = request.query_params.get('since') or None
+        if since is not None:
+            try:
+                since = parse_datetime(since)
+            except ValueError:
+                since = None
+            if since is None:
+                return Response({"error": "since must be an ISO 8601 timestamp."}, status=status.HTTP_400_BAD_REQUEST)
+            if timezone.is_naive(since):
+                since = timezone.make_aware(since)
+
+        # A report is stamped before its transaction commits, so one still in flight at ``until`` can
+        # become visible with an earlier timestamp. The next export, which passes this back as since,
+        # re-reads the last EXPORT_SINCE_OVERLAP_SECONDS before it to pick those up.
+        until = timezone.now()
+        if since is not None:
+            since -= timedelta(seconds=get_since_overlap())
+        rows = export_rows(request.user, since=since, until=until)
+
+        if output == 'csv':
+            response = StreamingHttpResponse(gzipped_csv_stream(rows), content_type='application/gzip')
+            response['Content-Disposition'] = 'attachment; filename="export.csv.gz"'
+        else:
+            response = StreamingHttpResponse(ndjson_stream(rows), content_type='application/x-ndjson')
+        response['X-Export-Until'] = until.isoformat()
+        return response
+
 class SearchView(APIView):
     permission_classes = [permissions.IsAuthenticated]
-    # throttle_classes = [SearchThrottle]
+    throttle_classes = [SearchThrottle]
 
     def get(self, request):
         query = request.query_params.get('query')
@@ -167,92 +414,53 @@ class SearchView(APIView):
             return Response({"error": "At least one search query is required"}, status=status.HTTP_400_BAD_REQUEST)
 
         if query:
-            return self.filter_using_query(request, query)
-        elif phone_number:
-            return self.filter_using_phone_number(request, phone_number)
+            kind, response = 'name', self.filter_using_query(request, query)
+        else:
+            kind, response = 'phone_number', self.filter_using_phone_number(request, phone_number)
+
+        found = response.status_code == status.HTTP_200_OK and bool(response.data)
+        metrics.SEARCHES.inc(kind=kind, result='hit' if found else 'miss')
+        return response
             
     def filter_using_query(self, request, query):
-        results = []
-        added_phone_numbers = set()
+        stages = name_search_stages(query)
+        rows, next_position = paginate_stages(stages, decode_cursor(request, len(stages)), get_page_size(request))
+        results = name_search_results(rows, normalize_phone_number(request.user.phone_number), timezone.now())
 
-        users = User.objects.filter(name__icontains=query)
-        requesting_user = User.objects.filter(id=request.user.id).first()
-        
-        for user in users:
-            if user.phone_number not in added_phone_numbers:
-                spam_report = SpamReport.objects.filter(phone_number=user.phone_number).first()
-                spam_count = spam_report.spam_count if spam_report else 0
-
-                user_info = {
-                    "name": user.name,
-                    "phone_number": user.phone_number,
-                    "spam_count": spam_count,
-                }
+        return paginated_response(request, Response(results, status=status.HTTP_200_OK), next_position)
 
-                if user.contacts.filter(phone_number=requesting_user.phone_number).exists():
-                    if user.email:
-                        user_info["email"] = user.email
-
-                results.append(user_info)
-                added_phone_numbers.add(user.phone_number)
-
-        contacts = Contact.objects.filter(Q(name__istartswith=query) | Q(name__icontains=query)).distinct()
-        
-        for contact in contacts:
-            if contact.phone_number in added_phone_numbers:
-                continue
-
-            spam_report = SpamReport.objects.filter(phone_number=contact.phone_number).first()
-            spam_count = spam_report.spam_count if spam_report else 0
-
-            contact_info = {
-                "name": contact.name,
-                "phone_number": contact.phone_number,
-                "spam_count": spam_count
-            }
-
-            results.append(contact_info)
-            added_phone_numbers.add(contact.phone_number)
+    def filter_using_phone_number(self, request, phone_number):
+        position = decode_cursor(request, 1)
+        phone_number = normalize_phone_number(phone_number) or phone_number
+        requesting_phone_number = normalize_phone_number(request.user.phone_number)
 
-        return Response(results, status=status.HTTP_200_OK)
+        user_query = registered_user_query(phone_number, position)
+        user = user_query.first() if user_query is not None else None
 
-    def filter_using_phone_number(self, request, phone_number):
-        results = []
+        if user:
+            result = registered_user_result(user, phone_number, request.user.id, *spam_cache.get_reputation(phone_number))
+            return Response([result], status=status.HTTP_200_OK)
 
-        user = User.objects.filter(phone_number=phone_number).first()
-        contacts = Contact.objects.filter(phone_number=phone_number).distinct()
-        requesting_user = User.objects.filter(id=request.user.id).first()
+        rows, next_position = paginate_stages([phone_number_contacts(phone_number)], position, get_page_size(request))
 
-        spam_report = SpamReport.objects.filter(phone_number=phone_number).first()
-        spam_count = spam_report.spam_count if spam_report else 0
+        if not rows:
+            if position is None:
+                return Response({"error": "No contacts found."}, status=status.HTTP_404_NOT_FOUND)
+            return Response([], status=status.HTTP_200_OK)
 
-        if user:
-            contact_info = {
-                "name": user.name,
-                "phone_number": user.phone_number,
-                "spam_count": spam_count
-            }
-            
-            if request.user.contacts.filter(phone_number=phone_number).exists():
-                if user.email:
-                    contact_info["email"] = user.email
+        results = phone_number_contact_results(rows, requesting_phone_number, *spam_cache.get_reputation(phone_number))
+        return paginated_response(request, Response(results, status=status.HTTP_200_OK), next_position)
 
-            results.append(contact_info)
-        else:
-            for contact in contacts:
-                contact_info = {
-                    "name": contact.name,
-                    "phone_number": contact.phone_number,
-                    "spam_count": spam_count
-                }
+class QueryMetricsView(APIView):
+    permission_classes = [permissions.IsAdminUser]
 
-                if contact.owner.contacts.filter(phone_number=requesting_user.phone_number).exists():
-                    if contact.owner.email:
-                        contact_info["email"] = contact.owner.email
+    def get(self, request):
+        return Response(metrics.query_stats(), status=status.HTTP_200_OK)
 
-                results.append(contact_info)
+class MetricsView(APIView):
+    # The scraper's bearer token is checked by IsMetricsScraper, not parsed as a signed token.
+    authentication_classes = [SessionAuthentication, BasicAuthentication]
+    permission_classes = [IsMetricsScraper]
 
-            if not results:
-                return Response({"error": "No contacts found."}, status=status.HTTP_404_NOT_FOUND)
-            
-        return Response(results, status=status.HTTP_200_OK)
\ No newline at end of file
+    def get(self, request):
+        return HttpResponse(metrics.render(), content_type='text/plain; version=0.0.4; charset=utf-8')
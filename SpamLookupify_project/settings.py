@@ -10,11 +10,15 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/5.1/ref/settings/
 """
 
+import os
+import sys
 from pathlib import Path
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
 
+TESTING = sys.argv[1:2] == ['test']
+
 
 # Quick-start development settings - unsuitable for production
 # See https://docs.djangoproject.com/en/5.1/howto/deployment/checklist/
@@ -41,6 +45,7 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'SpamLookupify.middleware.MetricsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -49,6 +54,8 @@ MIDDLEWARE = [
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
     'SpamLookupify.middleware.CSRFCookieMiddleware',
+    'SpamLookupify.middleware.PasswordHashingBusyMiddleware',
+    'SpamLookupify.middleware.QueryInstrumentationMiddleware',
     'SpamLookupify.middleware.RequestLoggingMiddleware'
 ]
 
@@ -72,8 +79,89 @@ TEMPLATES = [
 
 REST_FRAMEWORK = {
     'EXCEPTION_HANDLER': 'SpamLookupify.exceptions.custom_exception_handler',
+    # Same output as DRF's JSONRenderer, encoded with orjson when it is installed.
+    'DEFAULT_RENDERER_CLASSES': [
+        'SpamLookupify.renderers.FastJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ],
+    'DEFAULT_AUTHENTICATION_CLASSES': [
+        'rest_framework.authentication.SessionAuthentication',
+        'SpamLookupify.authentication.SignedTokenAuthentication',
+        'rest_framework.authentication.BasicAuthentication',
+    ],
+}
+
+# Stateless tokens issued by /api/login/ with {"auth": "token"}; verified without a database query.
+AUTH_TOKEN = {
+    'KEYWORD': 'Bearer',
+    'MAX_AGE': 3600,
+}
+
+# Country code assumed for phone numbers entered without a '+' or '00' international prefix.
+PHONE_DEFAULT_COUNTRY_CODE = '1'
+
+# Search results are paginated with an opaque cursor; clients may ask for up to SEARCH_MAX_PAGE_SIZE rows.
+SEARCH_PAGE_SIZE = 50
+SEARCH_MAX_PAGE_SIZE = 500
+
+# A name search reads at most this many matching name index rows per stage, which keeps a page
+# cheap however common the query is. Queries matching more names list those closest to the query
+# alphabetically (e.g. "john" before "johnson") and leave the rest out.
+SEARCH_MAX_CANDIDATES = 1000
+
+# Upper bound on the phone numbers accepted by one /api/report-spam/bulk/ request.
+BULK_REPORT_MAX_NUMBERS = 5000
+
+# Upper bound on the contacts accepted by one /api/contacts/bulk/ upload.
+BULK_CONTACT_MAX_CONTACTS = 10000
+
+# Rows read per database round trip and written per chunk by the streaming /api/export/.
+EXPORT_CHUNK_SIZE = 2000
+
+# An incremental export (since=...) also re-sends the reports last filed this many seconds before
+# since, which were possibly still being written when the previous export read them. Keep it above
+# the longest spam report transaction; consumers deduplicate on (phone_number, last_reported_at).
+EXPORT_SINCE_OVERLAP_SECONDS = 60
+
+# Request logs are queued in memory and written with bulk_create by a background thread.
+# Tests use the synchronous mode so rows are visible as soon as the request returns.
+REQUEST_LOG = {
+    'MODE': 'sync' if TESTING else 'async',
+    'BATCH_SIZE': 200,
+    'FLUSH_INTERVAL': 1.0,
+    'MAX_QUEUE_SIZE': 10000,
+    'OVERFLOW': 'drop',
+    'BLOCK_TIMEOUT': 0.05,
 }
 
+# How long request logs are kept, per request_path prefix (the longest matching prefix wins).
+# `manage.py prune_request_logs` archives expired days to ARCHIVE_DIR and deletes them; run it daily.
+REQUEST_LOG_RETENTION = {
+    'DEFAULT_DAYS': 30,
+    'PATHS': {
+        '/api/login/': 90,
+        '/api/register/': 90,
+        '/metrics': 1,
+    },
+    'ARCHIVE_DIR': BASE_DIR / 'request-log-archive',
+    'BATCH_SIZE': 5000,
+    'PAUSE': 0.0,
+}
+
+# Per-request SQL query counts and DB time, reported in response headers and per endpoint
+# at /api/metrics/queries/ (staff only).
+QUERY_INSTRUMENTATION = {
+    'ENABLED': True,
+    'HEADERS': True,
+    'DUPLICATE_WARNING_THRESHOLD': 10,
+}
+
+# /metrics is open to staff users and to scrapers sending "Authorization: Bearer <METRICS_TOKEN>".
+METRICS_TOKEN = os.environ.get('METRICS_TOKEN')
+# Opt-in: addresses allowed to scrape without a token. Only list addresses of direct clients;
+# behind a reverse proxy every request comes from the proxy's address.
+METRICS_ALLOWED_IPS = []
+
 WSGI_APPLICATION = 'SpamLookupify_project.wsgi.application'
 
 
@@ -84,10 +172,91 @@ DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': BASE_DIR / 'db.sqlite3',
+        # Writers take the lock when the transaction starts and wait for it instead of
+        # failing when concurrent requests report the same number.
+        'OPTIONS': {
+            'transaction_mode': 'IMMEDIATE',
+            'timeout': 20,
+        },
+        # A file-backed test database lets the concurrency tests use real parallel connections.
+        'TEST': {
+            'NAME': BASE_DIR / 'test_db.sqlite3',
+        },
     }
 }
 
 
+# Caches
+# https://docs.djangoproject.com/en/5.1/topics/cache/
+
+# Spam scores are read through the 'spam_scores' cache. Only the score is cached: a phone
+# number search still looks up the registered user and the contacts holding the number, since
+# which emails they show depends on who is asking. LocMemCache evicts the least recently
+# used entries once MAX_ENTRIES is reached; point it at a shared backend (Redis, Memcached)
+# in production so every worker sees the same invalidations.
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    'spam_scores': {
+        'BACKEND': 'django.core.cache.backends.dummy.DummyCache' if TESTING else 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'spam-scores',
+        'OPTIONS': {
+            'MAX_ENTRIES': 100000,
+        },
+    },
+    # Rate limit counters. Set REDIS_URL so that all worker processes share them.
+    'throttle': {
+        'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+        'LOCATION': os.environ['REDIS_URL'],
+    } if os.environ.get('REDIS_URL') else {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'throttle',
+        'OPTIONS': {
+            'MAX_ENTRIES': 100000,
+        },
+    },
+}
+
+# Sliding-window rate limits from ratelimit.py; disabled while running the test suite.
+RATELIMIT = {
+    'ENABLED': not TESTING,
+    'CACHE': 'throttle',
+}
+
+# A spam report loses half its weight in spam_score after this many days (more than 0, at most
+# 36500). Run rebuild_spam_reputation after changing it.
+SPAM_REPUTATION_HALF_LIFE_DAYS = 30
+
+SPAM_SCORE_CACHE = {
+    'CACHE': 'spam_scores',
+    'TIMEOUT': 300,
+}
+
+
+# Scrypt with tuned parameters is preferred; hashes made by the other hashers still verify and
+# are upgraded on the next login. Tests use a fast hasher.
+PASSWORD_HASHERS = [
+    'SpamLookupify.hashers.TunedScryptPasswordHasher',
+    'SpamLookupify.hashers.TunedPBKDF2PasswordHasher',
+    'django.contrib.auth.hashers.PBKDF2SHA1PasswordHasher',
+]
+if TESTING:
+    PASSWORD_HASHERS = ['django.contrib.auth.hashers.MD5PasswordHasher', *PASSWORD_HASHERS]
+
+PASSWORD_HASHING = {
+    'SCRYPT_WORK_FACTOR': 2 ** 15,
+    'SCRYPT_BLOCK_SIZE': 8,
+    'SCRYPT_PARALLELISM': 1,
+    'PBKDF2_ITERATIONS': 870000,
+    # Admission control: at most MAX_CONCURRENT hashes at once, MAX_PENDING callers waiting, a 503
+    # for the rest. Hashing still blocks the request thread.
+    'LIMIT_CONCURRENCY': False,
+    'MAX_CONCURRENT': 4,
+    'MAX_PENDING': 64,
+    'QUEUE_TIMEOUT': 1.0,
+}
+
 # Password validation
 # https://docs.djangoproject.com/en/5.1/ref/settings/#auth-password-validators
 